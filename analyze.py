@@ -0,0 +1,217 @@
+"""
+Analyses archived games without a browser.
+
+    python analyze.py games.pgn -o analysis.jsonl             # every position of every game
+    python analyze.py positions.fen -o analysis.jsonl --movetime 500
+    python analyze.py games.pgn -o analysis.jsonl --resume    # skip what is already written
+
+Positions come from a PGN file (the position before every move of each main
+line) or from a file with one FEN per line, and are read lazily. They are
+searched on an `EnginePool` with one single-threaded Stockfish per usable core,
+which gets through more positions per second than fewer engines with more
+threads. Every result is appended to the JSONL output as soon as its search
+ends, so memory stays flat however long the input is, and a stopped run picks
+up where it left off with `--resume`, which skips the ids already in the output.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import chess
+import chess.pgn
+
+from cache import AnalysisCache
+from tune import usableCores
+from uci import EnginePool
+
+
+def readPositions(path):
+    """
+    Yields {"id", "fen", ...} for every position in a PGN or FEN file. Ids only
+    depend on the file, so they stay the same between runs.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        if path.lower().endswith(".pgn"):
+            yield from pgnPositions(f)
+            return
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                # Fills in the clocks of EPD style lines and rejects broken ones,
+                # which could crash the engine
+                fen = chess.Board(line).fen()
+            except ValueError as e:
+                print(f"Line {number} skipped: {e}")
+                continue
+            yield {"id": str(number), "fen": fen}
+
+
+def pgnPositions(f):
+    game_number = 0
+    while (game := chess.pgn.read_game(f)) is not None:
+        game_number += 1
+        board = game.board()
+        for ply, move in enumerate(game.mainline_moves()):
+            yield {
+                "id": f"{game_number}:{ply}",
+                "game": game_number,
+                "ply": ply,
+                "fen": board.fen(),
+                "played": move.uci(),
+            }
+            board.push(move)
+
+
+def finishedIds(path) -> set[str]:
+    """
+    Ids of the results already in `path`. A line cut short by a stopped run
+    doesn't count, its position is analysed again.
+    """
+    done = set()
+    if not os.path.isfile(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def endsWithNewline(path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def cacheSettings(limits) -> str:
+    # Same key as `ChessBoard.engineSettings` at skill 20 in depth mode, so the bot
+    # and the batch share results
+    name, value = next(iter(limits.items()))
+    return f"default; {name} {value}"
+
+
+async def analyze(path, output, engine, size, limits, resume=False, cache=None, report=10):
+    """
+    Analyses every position of `path` into `output`. Returns the counters.
+    """
+    done = finishedIds(output) if resume else set()
+    if done:
+        print(f"Resuming, {len(done)} positions already in {output}")
+    counts = {"analysed": 0, "cached": 0, "skipped": 0}
+    settings = cacheSettings(limits)
+    queue = asyncio.Queue(maxsize=size * 2)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    pool = await EnginePool(engine, size, {"Threads": 1, "UCI_ShowWDL": True}).start()
+    print(f"Analysing {path} with {size} engines, {settings.split('; ')[1]}")
+
+    with open(output, "a" if resume else "w", encoding="utf-8") as out:
+        if resume and out.tell() > 0 and not endsWithNewline(output):
+            # Keeps a line cut short by a stopped run apart from the new ones
+            out.write("\n")
+
+        async def feed():
+            for position in readPositions(path):
+                if position["id"] in done:
+                    counts["skipped"] += 1
+                    continue
+                await queue.put(position)
+            for _ in range(size):
+                await queue.put(None)
+
+        async def work():
+            while (position := await queue.get()) is not None:
+                searched = loop.time()
+                key = AnalysisCache.makeKey(position["fen"], settings)
+                analysis = cache.get(key) if cache else None
+                if analysis is None:
+                    analysis = await pool.analyse(position["fen"], limits=limits)
+                    if cache:
+                        cache.put(key, analysis)
+                else:
+                    counts["cached"] += 1
+                result = {
+                    **position,
+                    "move": analysis["move"],
+                    "ponder": analysis["ponder"],
+                    "score": analysis["score"],
+                    "wdl": analysis["wdl"],
+                    "depth": analysis["depth"],
+                    "nodes": analysis["nodes"],
+                    "ms": round((loop.time() - searched) * 1000, 1),
+                }
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                counts["analysed"] += 1
+
+        async def progress():
+            while True:
+                await asyncio.sleep(report)
+                elapsed = loop.time() - start
+                print(
+                    f"{counts['analysed']} analysed, {counts['skipped']} skipped, "
+                    f"{counts['analysed'] / elapsed:.1f} positions/s"
+                )
+
+        reporter = asyncio.create_task(progress())
+        tasks = [asyncio.create_task(feed())]
+        tasks += [asyncio.create_task(work()) for _ in range(size)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            reporter.cancel()
+            for task in tasks:
+                task.cancel()
+            await pool.close()
+
+    counts["seconds"] = round(loop.time() - start, 2)
+    counts["rate"] = round(counts["analysed"] / max(counts["seconds"], 1e-9), 2)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="a .pgn file, or a file with one FEN per line")
+    parser.add_argument("-o", "--output", default="analysis.jsonl")
+    parser.add_argument("--depth", type=int, default=18)
+    parser.add_argument("--movetime", type=int, help="milliseconds per position, instead of --depth")
+    parser.add_argument("--engines", type=int, default=usableCores(), help="Stockfish processes")
+    parser.add_argument("--engine", help="Stockfish binary, by default the bot's")
+    parser.add_argument("--resume", action="store_true", help="skip positions already in the output")
+    parser.add_argument("--cache", help="analysis cache to read and fill, e.g. analysis_cache.sqlite")
+    parser.add_argument("--report", type=float, default=10, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    engine = args.engine
+    if engine is None:
+        # Imported here, it pulls in Selenium
+        from stockChessBot import findStockfish
+
+        engine = findStockfish()
+    limits = {"movetime": args.movetime} if args.movetime else {"depth": args.depth}
+    cache = AnalysisCache(args.cache) if args.cache else None
+
+    started = time.perf_counter()
+    try:
+        counts = asyncio.run(
+            analyze(args.input, args.output, engine, args.engines, limits, args.resume, cache, args.report)
+        )
+    except KeyboardInterrupt:
+        print(f"Stopped after {time.perf_counter() - started:.0f}s, continue with --resume")
+    else:
+        print(
+            f"Done: {counts['analysed']} positions ({counts['cached']} from the cache, "
+            f"{counts['skipped']} skipped) in {counts['seconds']}s, "
+            f"{counts['rate']} positions/s. Written to {args.output}"
+        )
+    finally:
+        if cache:
+            cache.close()
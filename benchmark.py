@@ -0,0 +1,325 @@
+"""
+Latency benchmarks for the bot.
+
+    python benchmark.py diff     # board diff / move inference micro-benchmark
+    python benchmark.py fixture  # BoardHTML end to end against fixture/board.html
+    python benchmark.py fixture --transport cdp  # same over the DevTools websocket
+    python benchmark.py sim --games 20   # self-play on simulated.SimulatedBoard
+
+The fixture benchmark serves a static copy of the chess.com board DOM from
+localhost, runs `BoardHTML` against it in headless Chrome with scripted
+opponent moves and writes p50/p99 latencies as JSON, so runs can be compared
+between commits without a chess.com session or any network access. The sim
+benchmark needs no browser at all: the whole game loop plays games against a
+second engine (or random moves) on an in-memory board and reports moves per minute.
+"""
+
+import argparse
+import functools
+import http.server
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import timeit
+
+import chess
+
+from compactBoard import CompactBoard
+
+
+fixture_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixture")
+
+
+# Positions and moves covering every kind of move the diff has to recognise
+diff_cases = [
+    ("quiet", chess.STARTING_FEN, "g1f3"),
+    ("capture", "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2", "e4d5"),
+    ("castling", "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1g1"),
+    ("en passant", "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", "e5f6"),
+    ("promotion", "8/1P4k1/8/8/8/8/6K1/8 w - - 0 1", "b7b8n"),
+]
+
+
+def compactFromBoard(board: chess.Board) -> CompactBoard:
+    squares = bytearray(64)
+    for square, piece in board.piece_map().items():
+        squares[square] = ord(piece.symbol())
+    return CompactBoard(squares)
+
+
+def benchDiff(number=100_000):
+    print(f"{'case':<12} {'move':<7} {'us/diff':>8}")
+    for name, fen, move in diff_cases:
+        board = chess.Board(fen)
+        before = compactFromBoard(board)
+        board.push_uci(move)
+        after = compactFromBoard(board)
+        inferred = before.diff(after)
+        if inferred != move:
+            raise AssertionError(f"{name}: expected {move}, got {inferred}")
+        seconds = timeit.timeit(lambda: before.diff(after), number=number)
+        print(f"{name:<12} {move:<7} {seconds / number * 1e6:>8.2f}")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    Turns lists of durations in seconds into p50/p99/mean milliseconds per stage.
+    """
+    summary = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        summary[name] = {
+            "n": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        }
+    return summary
+
+
+def currentCommit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def serveFixture():
+    """
+    Serves the fixture directory on a free localhost port from a daemon thread.
+    """
+    handler = functools.partial(
+        http.server.SimpleHTTPRequestHandler, directory=fixture_dir
+    )
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed(owner, name, samples):
+    """
+    Replaces `owner.name` with a wrapper that appends each call's duration to `samples`.
+    """
+    original = getattr(owner, name)
+
+    def wrapper(*args, **kwargs):
+        t1 = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - t1)
+
+    setattr(owner, name, wrapper)
+
+
+def resetFixtureGame(board):
+    board.execute_script("window.fixture.reset()")
+    board.model.reset()
+    board.previousBoard = board.getBoardArray(board.getBoardSnapshot())
+    board.state.invalidate()
+    board.boardVersion = None
+    board.castlingRights = [True, True, True, True]
+    board.updateCastlingString()
+
+
+def benchFixture(
+    moves=40, depth=8, headless=True, output="bench_results.json", seed=0, transport="selenium"
+):
+    # Imported here so `benchmark.py diff` works without selenium
+    from selenium import webdriver
+    from stockChessBot import BoardHTML
+    from cache import AnalysisCache
+
+    server = serveFixture()
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1000,1000")
+    url = f"http://127.0.0.1:{server.server_address[1]}/board.html"
+
+    board = BoardHTML(url=url, options=options, transport=transport)
+    board.initializeStockfish()
+    board.game.depth = str(depth)
+    # Measure the plain path: no waiting, pondering or cached answers
+    board.min_wait = board.max_wait = 0
+    board.ponderEnabled = False
+    board.cache = AnalysisCache(":memory:")
+    board.turn = "w"
+
+    samples = {
+        "roundtrip": [],
+        "getBoardArray": [],
+        "hasOponentMoved": [],
+        "engine": [],
+        "movePiece": [],
+    }
+    # With no response wait, finishing the wait is waiting for the search
+    timed(board, "finishWait", samples["engine"])
+    timed(board, "movePiece", samples["movePiece"])
+
+    rng = random.Random(seed)
+    mirror = chess.Board()
+    resetFixtureGame(board)
+    try:
+        for _ in range(moves):
+            movestring = board.play()
+            if movestring is None:
+                break
+            mirror.push_uci(movestring)
+
+            for _ in range(5):
+                t1 = time.perf_counter()
+                board.runScript("return 0")
+                samples["roundtrip"].append(time.perf_counter() - t1)
+                t1 = time.perf_counter()
+                board.getBoardArray(board.getBoardSnapshot())
+                samples["getBoardArray"].append(time.perf_counter() - t1)
+
+            if not mirror.is_game_over():
+                reply = rng.choice(list(mirror.legal_moves))
+                mirror.push(reply)
+                t1 = time.perf_counter()
+                board.execute_script("window.fixture.play(arguments[0])", reply.uci())
+                while not (board.waitForBoardChange(0.5) and board.hasOponentMoved()):
+                    pass
+                samples["hasOponentMoved"].append(time.perf_counter() - t1)
+
+            if mirror.is_game_over():
+                mirror.reset()
+                resetFixtureGame(board)
+    finally:
+        board.quit()
+        server.shutdown()
+
+    results = {
+        "commit": currentCommit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "moves": moves,
+        "depth": depth,
+        "transport": transport,
+        "stats": summarize(samples),
+    }
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'stage':<16} {'n':>4} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, stats in results["stats"].items():
+        print(f"{name:<16} {stats['n']:>4} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    print(f"Results written to {output}")
+    return results
+
+
+def benchSimulated(
+    games=10, depth=8, opponent_depth=None, random_opponent=False, output="bench_sim.json", seed=0
+):
+    from engine import Engine
+    from cache import AnalysisCache
+    from simulated import SimulatedBoard
+    from stockChessBot import findStockfish
+    import lifecycle
+
+    opponent = None
+    if not random_opponent:
+        opponent = Engine(findStockfish(), depth=opponent_depth or depth)
+    board = SimulatedBoard(
+        opponent=opponent, opponentLimits={"depth": opponent_depth or depth}, seed=seed
+    )
+    board.initializeStockfish(Engine(findStockfish(), depth=depth))
+    board.min_wait = board.max_wait = 0
+    board.cache = AnalysisCache(":memory:")
+
+    samples = {"tick": [], "engine": [], "movePiece": []}
+    timed(board, "finishWait", samples["engine"])
+    timed(board, "movePiece", samples["movePiece"])
+    moves = 0
+    start = time.perf_counter()
+    board.lifecycle.moveTo(lifecycle.waiting_for_game)
+    while len(board.games) < games:
+        t1 = time.perf_counter()
+        _, move = board.tick(0.5)
+        if move is not None:
+            moves += 1
+            samples["tick"].append(time.perf_counter() - t1)
+    seconds = time.perf_counter() - start
+
+    scores = {"win": 0, "draw": 0, "loss": 0}
+    for game in board.games:
+        if game["result"] == "1/2-1/2":
+            scores["draw"] += 1
+        elif (game["result"] == "1-0") == (game["color"] == "w"):
+            scores["win"] += 1
+        else:
+            scores["loss"] += 1
+    results = {
+        "commit": currentCommit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "games": games,
+        "moves": moves,
+        "depth": depth,
+        "opponent": "random" if random_opponent else f"depth {opponent_depth or depth}",
+        "moves_per_minute": round(moves / seconds * 60, 1),
+        "score": scores,
+        "ponder": [board.ponderHits, board.ponderMisses],
+        "stats": summarize(samples),
+    }
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'stage':<16} {'n':>5} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, stats in results["stats"].items():
+        print(f"{name:<16} {stats['n']:>5} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    print(
+        f"{moves} moves in {games} games, {results['moves_per_minute']} moves/min, "
+        f"{scores['win']} won, {scores['draw']} drawn, {scores['loss']} lost"
+    )
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff = sub.add_parser("diff", help="board diff / move inference micro-benchmark")
+    diff.add_argument("-n", "--number", type=int, default=100_000)
+    fixture = sub.add_parser("fixture", help="BoardHTML end to end in headless Chrome")
+    fixture.add_argument("--moves", type=int, default=40)
+    fixture.add_argument("--depth", type=int, default=8)
+    fixture.add_argument("--output", default="bench_results.json")
+    fixture.add_argument("--seed", type=int, default=0)
+    fixture.add_argument("--show", action="store_true", help="run Chrome with a window")
+    fixture.add_argument("--transport", choices=["selenium", "cdp"], default="selenium")
+    sim = sub.add_parser("sim", help="self-play against a second engine, no browser")
+    sim.add_argument("--games", type=int, default=10)
+    sim.add_argument("--depth", type=int, default=8)
+    sim.add_argument("--opponent-depth", type=int, help="defaults to --depth")
+    sim.add_argument("--random", action="store_true", help="random moves as the opponent")
+    sim.add_argument("--output", default="bench_sim.json")
+    sim.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "diff":
+        benchDiff(args.number)
+    elif args.command == "fixture":
+        benchFixture(
+            args.moves, args.depth, not args.show, args.output, args.seed, args.transport
+        )
+    elif args.command == "sim":
+        benchSimulated(
+            args.games, args.depth, args.opponent_depth, args.random, args.output, args.seed
+        )
@@ -0,0 +1,46 @@
+"""
+Polyglot opening book lookups, done before asking the engine.
+
+The `.bin` file is memory-mapped by `chess.polyglot` and binary-searched by the
+position's Zobrist key, so even large books are never loaded into RAM and a
+lookup takes microseconds.
+"""
+
+import chess
+import chess.polyglot
+
+
+class OpeningBook:
+    """
+    Memory-mapped Polyglot book.
+
+    Attributes:
+    - depth: How many of our moves per game may come from the book.
+    - weighted: Pick moves at random by their weight instead of always the heaviest one.
+    """
+
+    def __init__(self, path, depth=12, weighted=True):
+        self.path = path
+        self.depth = depth
+        self.weighted = weighted
+        self.reader = chess.polyglot.open_reader(path)
+
+    def lookup(self, fen: str, movesPlayed: int = 0) -> str | None:
+        """
+        Returns a book move in UCI notation for `fen`, or None if the position is
+        not in the book or we already played `depth` book moves this game.
+        """
+        if movesPlayed >= self.depth:
+            return None
+        board = chess.Board(fen)
+        try:
+            if self.weighted:
+                entry = self.reader.weighted_choice(board)
+            else:
+                entry = self.reader.find(board)
+        except IndexError:
+            return None
+        return entry.move.uci()
+
+    def close(self):
+        self.reader.close()
@@ -0,0 +1,90 @@
+"""
+Cache of engine analysis results keyed by position and engine settings.
+
+A bounded in-memory LRU sits in front of a sqlite table, so positions that come
+up again (openings in particular) skip the engine, also across restarts.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalizeFen(fen: str) -> str:
+    """
+    Drops the halfmove clock and move number, which don't change the analysis.
+    """
+    return " ".join(fen.split(" ")[:4])
+
+
+class AnalysisCache:
+    """
+    Two-tier LRU + sqlite cache of `Engine.analyse` results.
+
+    Attributes:
+    - hits, misses: Lookup counters across both tiers.
+    - diskHits: How many of the hits came from sqlite rather than memory.
+    """
+
+    def __init__(self, path="analysis_cache.sqlite", size=4096):
+        self.size = size
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.diskHits = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # Every put is its own transaction, WAL without a sync per commit keeps
+        # them cheap. A crash can lose the last few entries, not corrupt the file
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+        )
+
+    @staticmethod
+    def makeKey(fen: str, settings: str) -> str:
+        return f"{normalizeFen(fen)}|{settings}"
+
+    def get(self, key: str) -> dict | None:
+        with self.lock:
+            result = self.memory.get(key)
+            if result is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return result
+
+            row = self.db.execute(
+                "SELECT result FROM analysis WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            result = json.loads(row[0])
+            self._remember(key, result)
+            self.hits += 1
+            self.diskHits += 1
+            return result
+
+    def put(self, key: str, result: dict) -> None:
+        with self.lock:
+            self._remember(key, result)
+            self.db.execute(
+                "INSERT OR REPLACE INTO analysis (key, result) VALUES (?, ?)",
+                (key, json.dumps(result)),
+            )
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    def hitRate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        self.db.close()
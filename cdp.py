@@ -0,0 +1,194 @@
+"""
+Chrome DevTools Protocol transport for the hot paths of `BoardHTML`.
+
+Every Selenium call goes through chromedriver's HTTP server before it reaches
+Chrome. `CdpTransport` connects straight to the page's DevTools websocket
+(the address chromedriver reports in `goog:chromeOptions.debuggerAddress`) with
+`trio-websocket`, which Selenium already depends on. The trio event loop runs
+on a daemon thread, blocking callers hop onto it with `trio.from_thread`.
+"""
+
+import itertools
+import json
+import threading
+import urllib.request
+
+import trio
+import trio_websocket
+from selenium.common.exceptions import WebDriverException
+
+
+class CdpError(WebDriverException):
+    """
+    A DevTools command failed or the connection is gone. `BoardHTML` closes the
+    transport on this and goes through chromedriver instead.
+    """
+
+
+class CdpTransport:
+    """
+    Websocket connection to one page target.
+
+    Attributes:
+    - bindings: Latest payload per `Runtime.addBinding` name, set when the page
+      calls `window.<name>(payload)`.
+    """
+
+    def __init__(self, debugger_address, target_id=None, timeout=10):
+        with urllib.request.urlopen(f"http://{debugger_address}/json/list", timeout=timeout) as response:
+            targets = [t for t in json.load(response) if t["type"] == "page"]
+        if not targets:
+            raise CdpError(f"No page target at {debugger_address}")
+        target = next((t for t in targets if t["id"] == target_id), targets[0])
+
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.bindings = {}
+        self.changed = threading.Condition()
+        self.token = None
+        self.cancel_scope = None
+        self.error = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(
+            target=trio.run, args=(self._run, target["webSocketDebuggerUrl"]), daemon=True
+        )
+        self.thread.start()
+        if not self.ready.wait(timeout) or self.error:
+            raise CdpError(f"Could not connect to DevTools: {self.error}")
+
+    async def _run(self, url):
+        try:
+            async with trio_websocket.open_websocket_url(url, max_message_size=2**24) as ws:
+                self.ws = ws
+                self.token = trio.lowlevel.current_trio_token()
+                with trio.CancelScope() as self.cancel_scope:
+                    self.ready.set()
+                    while True:
+                        self._dispatch(json.loads(await ws.get_message()))
+        except (OSError, trio_websocket.HandshakeError, trio_websocket.ConnectionClosed) as e:
+            self.error = e
+        finally:
+            if self.error is None:
+                self.error = "closed"
+            self.ready.set()
+            for waiter in self.pending.values():
+                waiter["event"].set()
+
+    def _dispatch(self, message):
+        if "id" in message:
+            waiter = self.pending.pop(message["id"], None)
+            if waiter is not None:
+                waiter["message"] = message
+                waiter["event"].set()
+        elif message.get("method") == "Runtime.bindingCalled":
+            params = message["params"]
+            with self.changed:
+                self.bindings[params["name"]] = params["payload"]
+                self.changed.notify_all()
+
+    async def _send(self, method, params):
+        waiter = {"event": trio.Event(), "message": None}
+        command_id = next(self.ids)
+        self.pending[command_id] = waiter
+        await self.ws.send_message(
+            json.dumps({"id": command_id, "method": method, "params": params})
+        )
+        return waiter
+
+    async def _callMany(self, commands):
+        # Everything is sent before waiting, Chrome answers in order
+        waiters = [await self._send(method, params) for method, params in commands]
+        results = []
+        for waiter in waiters:
+            await waiter["event"].wait()
+            message = waiter["message"]
+            if message is None:
+                raise CdpError(f"DevTools connection closed: {self.error}")
+            if "error" in message:
+                raise CdpError(message["error"].get("message", str(message["error"])))
+            results.append(message.get("result", {}))
+        return results
+
+    def call(self, method, **params):
+        return self.callMany([(method, params)])[0]
+
+    def callMany(self, commands):
+        """
+        Sends [(method, params), ...] as one batch, returns their results in order.
+        """
+        if self.error is not None or self.token is None:
+            raise CdpError(f"DevTools connection closed: {self.error}")
+        try:
+            return trio.from_thread.run(self._callMany, commands, trio_token=self.token)
+        except trio.RunFinishedError:
+            raise CdpError(f"DevTools connection closed: {self.error}") from None
+
+    def evaluate(self, script, *args):
+        """
+        Runs `script` like Selenium's `execute_script`: as a function body that can
+        `return` a JSON value and reads its arguments from `arguments`.
+        """
+        expression = f"(function() {{ {script} }}).apply(null, {json.dumps(args)})"
+        result = self.call(
+            "Runtime.evaluate", expression=expression, returnByValue=True
+        )
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            text = details.get("exception", {}).get("description") or details.get("text")
+            raise CdpError(f"Script failed: {text}")
+        return result["result"].get("value")
+
+    def click(self, x, y):
+        """
+        Left click at viewport coordinates (x, y) with a single batch of mouse events.
+        """
+        self.clickMany([(x, y)])
+
+    def clickMany(self, points):
+        """
+        Left clicks at [(x, y), ...] in viewport coordinates, all in one batch.
+        """
+        commands = []
+        for x, y in points:
+            commands += [
+                ("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": x, "y": y}),
+                (
+                    "Input.dispatchMouseEvent",
+                    {"type": "mousePressed", "x": x, "y": y, "button": "left", "clickCount": 1},
+                ),
+                (
+                    "Input.dispatchMouseEvent",
+                    {"type": "mouseReleased", "x": x, "y": y, "button": "left", "clickCount": 1},
+                ),
+            ]
+        self.callMany(commands)
+
+    def addBinding(self, name):
+        """
+        Exposes `window.<name>(payload)` to the page, see `waitForBinding`.
+        """
+        self.callMany([("Runtime.enable", {}), ("Runtime.addBinding", {"name": name})])
+
+    def waitForBinding(self, name, since, timeout):
+        """
+        Waits until the page calls binding `name` with a payload other than `since`.
+        Returns the payload, or None after `timeout` seconds.
+        """
+        with self.changed:
+            self.changed.wait_for(
+                lambda: self.bindings.get(name, since) != since, timeout
+            )
+            payload = self.bindings.get(name, since)
+        return None if payload == since else payload
+
+    def resetBinding(self, name):
+        with self.changed:
+            self.bindings.pop(name, None)
+
+    def close(self):
+        if self.token is not None and self.cancel_scope is not None:
+            try:
+                trio.from_thread.run_sync(self.cancel_scope.cancel, trio_token=self.token)
+            except trio.RunFinishedError:
+                pass
+        self.thread.join(2)
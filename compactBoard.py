@@ -0,0 +1,128 @@
+"""
+Compact board representation and move inference by diffing two snapshots.
+
+A position is a 64-byte `bytearray` indexed like python-chess (a1 = 0, h8 = 63)
+holding the FEN letter of the piece on each square, or 0 when it is empty.
+Comparing two of them gives the exact UCI move that was played, including
+castling, en passant and promotion, without building any strings.
+"""
+
+empty = 0
+white_king, black_king = ord("K"), ord("k")
+white_pawn, black_pawn = ord("P"), ord("p")
+
+files = "abcdefgh"
+
+
+def squareIndex(name: str) -> int:
+    return (int(name[1]) - 1) * 8 + files.index(name[0])
+
+
+def squareName(index: int) -> str:
+    return f"{files[index & 7]}{(index >> 3) + 1}"
+
+
+class CompactBoard:
+    """
+    64-byte board, indexable by square index or name: `b[4]` or `b["e1"]`.
+    Empty squares read as "_".
+    """
+
+    __slots__ = ("squares",)
+
+    def __init__(self, squares=None):
+        self.squares = squares if squares is not None else bytearray(64)
+
+    @classmethod
+    def fromTokens(cls, tokens, mapping):
+        """
+        Builds a board from snapshot tokens such as "wp52" (piece, file, rank),
+        `mapping` turns "wp" into the FEN letter.
+        """
+        squares = bytearray(64)
+        for token in tokens:
+            squares[(int(token[3]) - 1) * 8 + int(token[2]) - 1] = ord(mapping[token[:2]])
+        return cls(squares)
+
+    def __getitem__(self, square):
+        if isinstance(square, str):
+            square = squareIndex(square)
+        piece = self.squares[square]
+        return chr(piece) if piece else "_"
+
+    def __eq__(self, other):
+        return isinstance(other, CompactBoard) and self.squares == other.squares
+
+    def copy(self):
+        return CompactBoard(bytearray(self.squares))
+
+    def placement(self) -> str:
+        """
+        Returns the piece placement field of a FEN.
+        """
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ""
+            empty_count = 0
+            for piece in self.squares[rank * 8 : rank * 8 + 8]:
+                if piece == empty:
+                    empty_count += 1
+                    continue
+                if empty_count:
+                    row += str(empty_count)
+                    empty_count = 0
+                row += chr(piece)
+            if empty_count:
+                row += str(empty_count)
+            rows.append(row)
+        return "/".join(rows)
+
+    def diff(self, after) -> str | None:
+        """
+        Infers the UCI move that turns this board into `after`.
+        Returns None if no single move explains the difference.
+        """
+        before, now = self.squares, after.squares
+        if before == now:
+            return None
+        changed = [i for i in range(64) if before[i] != now[i]]
+
+        if len(changed) == 2:
+            a, b = changed
+            # The square that is empty afterwards is the origin
+            if now[a] == empty:
+                origin, target = a, b
+            elif now[b] == empty:
+                origin, target = b, a
+            else:
+                return None
+            moved, arrived = before[origin], now[target]
+            if moved == arrived:
+                return squareName(origin) + squareName(target)
+            if moved in (white_pawn, black_pawn) and (target >> 3) in (0, 7):
+                return squareName(origin) + squareName(target) + chr(arrived).lower()
+            return None
+
+        if len(changed) == 3:
+            # En passant: the pawn leaves its square, lands on an empty one and the
+            # captured pawn next to the origin disappears
+            targets = [i for i in changed if before[i] == empty and now[i] != empty]
+            if len(targets) != 1 or now[targets[0]] not in (white_pawn, black_pawn):
+                return None
+            target = targets[0]
+            origins = [i for i in changed if before[i] == now[target] and now[i] == empty]
+            if len(origins) != 1:
+                return None
+            return squareName(origins[0]) + squareName(target)
+
+        if len(changed) == 4:
+            # Castling: report the king's two-square move
+            for king in (white_king, black_king):
+                origins = [i for i in changed if before[i] == king and now[i] == empty]
+                targets = [i for i in changed if now[i] == king]
+                if len(origins) == 1 and len(targets) == 1:
+                    if abs(targets[0] - origins[0]) == 2:
+                        return squareName(origins[0]) + squareName(targets[0])
+            return None
+
+        return None
@@ -0,0 +1,272 @@
+"""
+Stockfish wrapper that gets everything the bot needs out of a single search.
+
+The `stockfish` package starts a new search for every question it is asked
+(`get_best_move`, `get_wdl_stats`, `get_evaluation`). `Engine.analyse` runs one
+`go` and collects the bestmove, score, WDL, PV, depth and nodes from the `info`
+lines as they arrive.
+"""
+
+import concurrent.futures
+import time
+
+import chess
+import stockfish as st
+
+
+# Keys of an `info` line that are followed by a single integer
+info_int_keys = {
+    "depth",
+    "seldepth",
+    "multipv",
+    "nodes",
+    "nps",
+    "time",
+    "hashfull",
+    "tbhits",
+}
+
+
+def parseInfoLine(line: str) -> dict | None:
+    """
+    Parses a UCI `info` line into a dict. Returns None for lines that carry no
+    search result, e.g. `info string ...` or `info depth 12 currmove e2e4 ...`.
+    """
+    tokens = line.split()
+    if len(tokens) < 2 or tokens[0] != "info" or tokens[1] == "string":
+        return None
+
+    info = {}
+    i = 1
+    while i < len(tokens):
+        key = tokens[i]
+        if key in info_int_keys:
+            info[key] = int(tokens[i + 1])
+            i += 2
+        elif key == "score":
+            info["score"] = {"type": tokens[i + 1], "value": int(tokens[i + 2])}
+            i += 3
+            if i < len(tokens) and tokens[i] in ("lowerbound", "upperbound"):
+                info["score"]["bound"] = tokens[i]
+                i += 1
+        elif key == "wdl":
+            info["wdl"] = [int(x) for x in tokens[i + 1 : i + 4]]
+            i += 4
+        elif key == "pv":
+            info["pv"] = tokens[i + 1 :]
+            break
+        else:
+            i += 1
+
+    if "score" not in info:
+        return None
+    return info
+
+
+class LiveAnalysis:
+    """
+    Collects the `info` lines of a running search by MultiPV index and hands the
+    current top lines to `publish` at most every `interval` seconds, so a fast
+    engine can't flood whoever listens. Called from the thread reading the engine.
+    """
+
+    def __init__(self, publish, interval=0.1, pv_length=8):
+        self.publish = publish
+        self.interval = interval
+        self.pv_length = pv_length
+        self.reset()
+
+    def reset(self):
+        self.lines = {}
+        self.last = 0.0
+
+    def __call__(self, info):
+        self.lines[info.get("multipv", 1)] = info
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.flush()
+
+    def flush(self):
+        if not self.lines:
+            return
+        lines = [
+            {
+                "multipv": index,
+                "depth": info.get("depth", 0),
+                "score": info["score"],
+                "wdl": info.get("wdl"),
+                "pv": info.get("pv", [])[: self.pv_length],
+            }
+            for index, info in sorted(self.lines.items())
+        ]
+        self.publish({"depth": lines[0]["depth"], "lines": lines})
+
+
+class Engine(st.Stockfish):
+    """
+    Stockfish process with a one-search analysis API on top of the `stockfish` wrapper.
+    The wrapper turns on UCI_ShowWDL itself, so every search reports WDL.
+    """
+
+    pondering = False
+    searching = False
+    reader = None
+
+    def analyse(self, limits: dict | None = None, onInfo=None) -> dict:
+        """
+        Searches the current position once and returns a dict with the "move" and
+        "ponder" from `bestmove` plus "score", "wdl", "pv", "depth" and "nodes"
+        from the last principal `info` line. Scores are relative to the side to move.
+
+        `limits` are `go` parameters such as {"wtime": 60000, "btime": 60000};
+        without them the search runs to the configured depth. `onInfo(info)` is
+        called with every parsed `info` line while the search runs.
+        """
+        self._goWith(limits)
+        return self._readAnalysis(onInfo)
+
+    def submit(self, limits: dict | None = None, onInfo=None) -> concurrent.futures.Future:
+        """
+        Starts `analyse` without waiting for it. The engine's output is read on a
+        helper thread, the returned future gives the analysis.
+        """
+        self._goWith(limits)
+        return self._readInBackground(onInfo)
+
+    def _readInBackground(self, onInfo):
+        if self.reader is None:
+            self.reader = concurrent.futures.ThreadPoolExecutor(1, "engine-reader")
+        return self.reader.submit(self._readAnalysis, onInfo)
+
+    def setMultiPV(self, lines: int) -> None:
+        self.update_engine_parameters({"MultiPV": lines})
+
+    def setHash(self, megabytes: int) -> None:
+        self.update_engine_parameters({"Hash": megabytes})
+
+    def setSyzygyPath(self, path: str) -> None:
+        # Not one of the wrapper's known parameters, set directly
+        self._set_option("SyzygyPath", path)
+
+    def _goWith(self, limits, ponder=False):
+        command = "go ponder" if ponder else "go"
+        if limits:
+            command += "".join(f" {name} {value}" for name, value in limits.items())
+        else:
+            command += f" depth {self.depth}"
+        self._put(command)
+        self.searching = True
+
+    def _readAnalysis(self, onInfo=None) -> dict:
+        # Precondition - a "go" command must have been sent before calling this.
+        result = {
+            "move": None,
+            "ponder": None,
+            "score": None,
+            "wdl": None,
+            "pv": [],
+            "depth": 0,
+            "nodes": 0,
+        }
+        last_text = ""
+        while True:
+            text = self._read_line()
+            if text.startswith("info"):
+                info = parseInfoLine(text)
+                if info and onInfo is not None:
+                    onInfo(info)
+                if info and info.get("multipv", 1) == 1:
+                    result["score"] = info["score"]
+                    result["wdl"] = info.get("wdl", result["wdl"])
+                    result["pv"] = info.get("pv", result["pv"])
+                    result["depth"] = info.get("depth", result["depth"])
+                    result["nodes"] = info.get("nodes", result["nodes"])
+                last_text = text
+            elif text.startswith("bestmove"):
+                self.searching = False
+                self.info = last_text
+                tokens = text.split()
+                if tokens[1] != "(none)":
+                    result["move"] = tokens[1]
+                if len(tokens) > 3 and tokens[2] == "ponder":
+                    result["ponder"] = tokens[3]
+                return result
+
+    def warmUp(self, movetime: int = 200) -> float:
+        """
+        Runs a short search from the start position so the network is loaded and
+        the hash table and search threads are allocated before the first real
+        move. Returns how long it took in seconds.
+        """
+        t1 = time.perf_counter()
+        self.setPosition(chess.STARTING_FEN, [])
+        self._goWith({"movetime": movetime})
+        self._readAnalysis()
+        return time.perf_counter() - t1
+
+    def stop(self) -> None:
+        """
+        Ends a running `analyse` early from another thread, it then returns the
+        best move found so far.
+        """
+        if self.searching and not self.pondering:
+            self._put("stop")
+
+    def kill(self) -> None:
+        """
+        Ends the process at once, a search still reading its output raises.
+        """
+        self._stockfish.kill()
+        self._stockfish.wait()
+        self.searching = False
+        self.pondering = False
+
+    def setPosition(self, fen: str, moves: list[str], newGame: bool = False) -> None:
+        """
+        Sends the game as `position startpos moves ...` (or `position fen ... moves ...`).
+        Unlike `set_fen_position` this keeps the game context and the hash table,
+        unless `newGame` asks for a `ucinewgame`.
+        """
+        self._prepare_for_new_position(newGame)
+        command = "position startpos" if fen == chess.STARTING_FEN else f"position fen {fen}"
+        if moves:
+            command += f" moves {' '.join(moves)}"
+        self._put(command)
+
+    def startPonder(self, fen: str, moves: list[str], limits: dict | None = None) -> None:
+        """
+        Starts `go ponder` on `fen` after `moves`, the last of which is the expected reply.
+        The engine must not be given other commands until `ponderHit` or `stopPonder`.
+        """
+        if self._parameters.get("Ponder") != "true":
+            self._set_option("Ponder", "true")
+        self.setPosition(fen, moves)
+        self._goWith(limits, ponder=True)
+        self.pondering = True
+
+    def ponderHit(self, onInfo=None) -> dict:
+        """
+        The opponent played the expected move, turns the ponder search into a normal
+        search and returns its analysis like `analyse`.
+        """
+        return self.submitPonderHit(onInfo).result()
+
+    def submitPonderHit(self, onInfo=None) -> concurrent.futures.Future:
+        """
+        `ponderHit` without waiting for the search, like `submit`.
+        """
+        self._put("ponderhit")
+        self.pondering = False
+        return self._readInBackground(onInfo)
+
+    def stopPonder(self) -> None:
+        """
+        Aborts a running ponder search and discards its result.
+        """
+        if not self.pondering:
+            return
+        self._put("stop")
+        self.pondering = False
+        while not self._read_line().startswith("bestmove"):
+            pass
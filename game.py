@@ -0,0 +1,90 @@
+"""
+Incremental model of the game being played.
+
+The DOM only shows where the pieces are. The model follows the game move by
+move, so it knows the move list, the en passant square, the halfmove clock and
+the repetition history, and can hand the engine `position startpos moves ...`
+instead of a fresh FEN every move.
+"""
+
+import chess
+
+
+class GameModel:
+    """
+    Move-by-move model of the current game on top of `chess.Board`.
+
+    Attributes:
+    - rootFen: The position the move list starts from, the start position unless
+      we joined the game in the middle or had to resync.
+    - board: The current position with its full move stack.
+    """
+
+    def __init__(self, fen=chess.STARTING_FEN):
+        self.reset(fen)
+
+    def reset(self, fen=chess.STARTING_FEN):
+        self.rootFen = fen
+        self.board = chess.Board(fen)
+
+    @property
+    def moves(self) -> list[str]:
+        return [move.uci() for move in self.board.move_stack]
+
+    @property
+    def turn(self) -> str:
+        return "w" if self.board.turn == chess.WHITE else "b"
+
+    def fen(self) -> str:
+        return self.board.fen()
+
+    def placement(self) -> str:
+        return self.board.board_fen()
+
+    def castlingString(self) -> str:
+        return self.board.castling_xfen() if self.board.castling_rights else "-"
+
+    def push(self, moveString: str) -> None:
+        self.board.push_uci(moveString)
+
+    def findMove(self, placement: str) -> str | None:
+        """
+        Returns the legal move that turns the current position into `placement`, if any.
+        """
+        for move in self.board.legal_moves:
+            self.board.push(move)
+            reached = self.board.board_fen() == placement
+            self.board.pop()
+            if reached:
+                return move.uci()
+        return None
+
+    def placementAfter(self, moveString: str) -> str:
+        """
+        Returns the piece placement after `moveString` without changing the model.
+        """
+        self.board.push_uci(moveString)
+        placement = self.board.board_fen()
+        self.board.pop()
+        return placement
+
+    def sync(self, placement: str, turn: str, move: str | None = None) -> bool:
+        """
+        Brings the model to the position shown on the page with `turn` to move,
+        playing the opponent's move if needed. `move` is the move inferred from the
+        board diff, it is tried first and only searched for if it doesn't fit.
+        Returns False if the position can't be reached by a single move (joined
+        mid-game, missed moves), then the caller must `reset` from the DOM.
+        """
+        if self.turn == turn:
+            return self.placement() == placement
+        if move is not None and chess.Move.from_uci(move) in self.board.legal_moves:
+            self.push(move)
+            if self.placement() == placement:
+                return True
+            self.board.pop()
+        move = self.findMove(placement)
+        if move is None:
+            return False
+        self.push(move)
+        return True
@@ -0,0 +1,63 @@
+"""
+Lifecycle of the game the bot is playing.
+
+    idle -> waiting_for_game -> our_turn <-> opponent_turn -> game_over
+                   ^                                             |
+                   +---------------------------------------------+
+
+`BoardHTML.updateLifecycle` advances it from the board snapshot that is read
+after every change the page's MutationObserver reports, so a game ending, a
+new game appearing and the board's orientation need no DOM queries of their
+own. The game loop only decides what to do from the current state.
+"""
+
+import threading
+import time
+
+idle = "idle"
+waiting_for_game = "waiting_for_game"
+our_turn = "our_turn"
+opponent_turn = "opponent_turn"
+game_over = "game_over"
+
+transitions = {
+    idle: {waiting_for_game},
+    waiting_for_game: {idle, our_turn, opponent_turn},
+    our_turn: {idle, opponent_turn, game_over},
+    opponent_turn: {idle, our_turn, game_over},
+    game_over: {idle, waiting_for_game},
+}
+
+
+class GameLifecycle:
+    """
+    Current lifecycle state with the transitions above. Moving to the current
+    state again is a no-op, anything not in `transitions` raises ValueError.
+
+    Attributes:
+    - since: `perf_counter` time of the last transition.
+    """
+
+    def __init__(self):
+        self.state = idle
+        self.since = time.perf_counter()
+        self.lock = threading.Lock()
+
+    @property
+    def playing(self) -> bool:
+        return self.state in (our_turn, opponent_turn)
+
+    def moveTo(self, state) -> bool:
+        """
+        Returns True if the state changed.
+        """
+        with self.lock:
+            old = self.state
+            if state == old:
+                return False
+            if state not in transitions[old]:
+                raise ValueError(f"Invalid lifecycle transition {old} -> {state}")
+            self.state = state
+            self.since = time.perf_counter()
+        print(f"Lifecycle: {old} -> {state}")
+        return True
@@ -1,12 +1,19 @@
+import time
+
+# Taken before the heavy imports so the reported startup times cover them
+launch_time = time.perf_counter()
+
 import customtkinter as tk
-from stockChessBot import BoardHTML
-import stockfish as st
+from tkinter import filedialog
 import threading
+import queue
+import os
 import keyboard
-import time
+from collections import deque
 from dotenv import load_dotenv
 
 import sys
+import lifecycle
 
 load_dotenv()
 
@@ -37,26 +44,59 @@ class DisplayStats:
         self.losses_label = tk.CTkLabel(self.frame, text="0%")
         self.losses_label.grid(row=1, column=2)
 
+        self.ponder_label = tk.CTkLabel(
+            self.frame, text="Ponder hits: -", font=("Consolas", 10)
+        )
+        self.ponder_label.grid(row=2, column=0, columnspan=3)
+        self.cache_label = tk.CTkLabel(
+            self.frame, text="Cache hits: -", font=("Consolas", 10)
+        )
+        self.cache_label.grid(row=3, column=0, columnspan=3)
+
     def update(self, stats):
         self.wins_label.configure(text=f"{stats[0] / 10}%")
         self.draws_label.configure(text=f"{stats[1] / 10}%")
         self.losses_label.configure(text=f"{stats[2] / 10}%")
 
+    def update_cache(self, hits, misses):
+        total = hits + misses
+        if total:
+            self.cache_label.configure(
+                text=f"Cache hits: {hits}/{total} ({round(hits / total * 100)}%)"
+            )
+
+    def update_ponder(self, hits, misses):
+        total = hits + misses
+        if total:
+            self.ponder_label.configure(
+                text=f"Ponder hits: {hits}/{total} ({round(hits / total * 100)}%)"
+            )
+
 
 class LogBox:
-    def __init__(self, parent):
+    """
+    Last `max_lines` log lines. New lines are appended to the end of the text box
+    and only the lines that fell out of the ring buffer are deleted from the top.
+    Must only be used from the Tk thread, workers go through `ChessBotGUI.post`.
+    """
+
+    def __init__(self, parent, max_lines=50):
         self.text_box = tk.CTkTextbox(parent, height=120, font=("Consolas", 11))
         self.text_box.pack(fill="both", expand=True, pady=5, padx=10)
-        self.lines = ["Bot initialized"]
-        self.text_box.insert("0.0", "\n".join(self.lines))
+        self.lines = deque(["Bot initialized"], maxlen=max_lines)
+        self.text_box.insert("end", self.lines[0])
 
     def add_line(self, line):
+        self.add_lines([line])
+
+    def add_lines(self, lines):
         timestamp = time.strftime("%H:%M:%S")
-        self.lines.append(f"[{timestamp}] {line}")
-        if len(self.lines) > 50:
-            self.lines.pop(0)
-        self.text_box.delete("0.0", "end")
-        self.text_box.insert("0.0", "\n".join(self.lines))
+        new = [f"[{timestamp}] {line}" for line in lines][-self.lines.maxlen :]
+        dropped = max(0, len(self.lines) + len(new) - self.lines.maxlen)
+        self.lines.extend(new)
+        self.text_box.insert("end", "\n" + "\n".join(new))
+        if dropped:
+            self.text_box.delete("1.0", f"{dropped + 1}.0")
         self.text_box.see("end")
 
 if sys.platform.startswith("linux"):
@@ -71,12 +111,98 @@ class ChessBotGUI:
         self.root.geometry("340x800")
         self.root.attributes("-topmost", 1)
 
-        self.board = BoardHTML()
+        # Chrome and Stockfish start in the background after the window is up,
+        # until then there is no board and the controls only update their labels
+        self.board = None
+        self.engine = None
         self.playing = False
+        self.thread = None
+        # Book and tables picked while the bot plays, loaded at the next START
+        self.pending_book = None
+        self.pending_tablebase = None
+        self.start_time = None
+        # Worker threads never touch widgets, they post (kind, payload) events
+        # that the Tk thread drains every `pump_interval` ms
+        self.events = queue.SimpleQueue()
+        self.pump_interval = 50
+        # Header text per game lifecycle state while the bot plays
+        self.lifecycle_labels = {
+            lifecycle.waiting_for_game: ("WAITING", "#FFC107"),
+            lifecycle.our_turn: ("OUR TURN", "#4CAF50"),
+            lifecycle.opponent_turn: ("THEIR TURN", "#4CAF50"),
+            lifecycle.game_over: ("GAME OVER", "#F44336"),
+        }
 
         self.setup_ui()
+        self.start_btn.configure(state="disabled", text="LOADING...")
+        self.root.after(0, self.window_shown)
+        self.root.after(self.pump_interval, self.pump_events)
+        threading.Thread(target=self.startup, daemon=True).start()
         self.root.mainloop()
 
+    def window_shown(self):
+        elapsed = time.perf_counter() - launch_time
+        self.log_box.add_line(f"Window shown after {elapsed:.2f}s")
+        print(f"Time to first window: {elapsed:.3f}s")
+
+    def startup(self):
+        """
+        Launches the browser and the engine in parallel. Runs on a worker thread.
+        """
+        engine_thread = threading.Thread(target=self.start_engine, daemon=True)
+        engine_thread.start()
+        try:
+            from stockChessBot import BoardHTML
+
+            board = BoardHTML()
+        except Exception as e:
+            self.post("log", f"Browser failed: {str(e)}")
+            return
+        self.post("log", f"Browser ready after {time.perf_counter() - launch_time:.2f}s")
+        engine_thread.join()
+        if self.engine is not None:
+            board.initializeStockfish(self.engine)
+        self.post("ready", board)
+
+    def start_engine(self):
+        try:
+            from stockChessBot import startEngine
+
+            engine = startEngine()
+            # One short search loads the network and allocates the hash and
+            # threads, so the first real move doesn't pay for it
+            warm_up = engine.warmUp()
+        except Exception as e:
+            self.post("log", f"Engine failed: {str(e)}")
+            return
+        self.engine = engine
+        self.post(
+            "log",
+            f"Engine ready after {time.perf_counter() - launch_time:.2f}s "
+            f"(warm-up {warm_up * 1000:.0f} ms)",
+        )
+
+    def board_ready(self, board):
+        self.board = board
+        self.apply_settings()
+        self.start_btn.configure(state="normal", text="START BOT")
+        self.log_box.add_line("Ready.")
+
+    def apply_settings(self):
+        """
+        Pushes everything changed in the UI while the board was loading.
+        """
+        self.update_speed_ui()
+        self.update_increment_ui()
+        self.board.timeMode = self.time_mode.get().lower()
+        self.board.eventDriven = self.event_var.get()
+        self.board.ponderEnabled = self.ponder_var.get()
+        from engine import LiveAnalysis
+
+        self.board.liveAnalysis = LiveAnalysis(lambda live: self.post("live", live))
+        if self.trace_var.get():
+            self.board.tracer.enable()
+
     def setup_ui(self):
         # 1. Header (Status)
         self.header = tk.CTkFrame(self.root, fg_color="#2b2b2b")
@@ -122,6 +248,9 @@ class ChessBotGUI:
         self.tabs.pack(fill="both", padx=10, pady=5)
         self.tabs.add("Engine")
         self.tabs.add("Actions")
+        self.tabs.add("Book")
+        self.tabs.add("Time")
+        self.tabs.add("Perf")
 
         # -- Engine Tab --
         engine_tab = self.tabs.tab("Engine")
@@ -200,6 +329,42 @@ class ChessBotGUI:
             fg_color="#3b3b3b",
         ).pack(pady=8, fill="x", padx=30)
 
+        self.event_var = tk.BooleanVar(value=True)
+        tk.CTkSwitch(
+            actions_tab,
+            text="Event-driven detection",
+            variable=self.event_var,
+            command=self.toggle_detection,
+        ).pack(pady=8, padx=30, anchor="w")
+
+        self.ponder_var = tk.BooleanVar(value=True)
+        tk.CTkSwitch(
+            actions_tab,
+            text="Ponder on opponent's time",
+            variable=self.ponder_var,
+            command=self.toggle_ponder,
+        ).pack(pady=8, padx=30, anchor="w")
+
+        self.multipv_var = tk.IntVar(value=1)
+        self.multipv_label = tk.CTkLabel(actions_tab, text="Live lines (MultiPV): 1")
+        self.multipv_label.pack(pady=(10, 0))
+        tk.CTkSlider(
+            actions_tab,
+            from_=1,
+            to=5,
+            number_of_steps=4,
+            variable=self.multipv_var,
+            command=self.update_multipv_ui,
+        ).pack(fill="x", padx=20)
+        self.pv_label = tk.CTkLabel(
+            actions_tab,
+            text="No search yet",
+            font=("Consolas", 10),
+            justify="left",
+            anchor="w",
+        )
+        self.pv_label.pack(pady=5, padx=20, fill="x")
+
         tk.CTkLabel(
             actions_tab, text="Shortcuts:", font=("Arial", 11, "bold"), justify="left"
         ).pack(pady=(20, 0), padx=30, anchor="w")
@@ -210,6 +375,105 @@ class ChessBotGUI:
             justify="left",
         ).pack(padx=30, anchor="w")
 
+        # -- Book Tab --
+        book_tab = self.tabs.tab("Book")
+        tk.CTkButton(
+            book_tab,
+            text="Load Polyglot Book (.bin)",
+            command=self.load_book,
+            fg_color="#3b3b3b",
+        ).pack(pady=8, fill="x", padx=30)
+        self.book_label = tk.CTkLabel(
+            book_tab, text="No book loaded", font=("Consolas", 10), text_color="#aaaaaa"
+        )
+        self.book_label.pack()
+
+        self.book_depth_var = tk.IntVar(value=12)
+        self.book_depth_label = tk.CTkLabel(book_tab, text="Book Depth: 12 moves")
+        self.book_depth_label.pack(pady=(10, 0))
+        tk.CTkSlider(
+            book_tab,
+            from_=0,
+            to=30,
+            number_of_steps=30,
+            variable=self.book_depth_var,
+            command=self.update_book_ui,
+        ).pack(fill="x", padx=20)
+
+        self.book_weighted_var = tk.BooleanVar(value=True)
+        tk.CTkSwitch(
+            book_tab,
+            text="Weighted random choice",
+            variable=self.book_weighted_var,
+            command=self.update_book_ui,
+        ).pack(pady=8, padx=30, anchor="w")
+
+        tk.CTkButton(
+            book_tab,
+            text="Load Syzygy Folder",
+            command=self.load_tablebase,
+            fg_color="#3b3b3b",
+        ).pack(pady=(16, 8), fill="x", padx=30)
+        self.tablebase_label = tk.CTkLabel(
+            book_tab, text="No tablebase loaded", font=("Consolas", 10), text_color="#aaaaaa"
+        )
+        self.tablebase_label.pack()
+
+        # -- Time Tab --
+        time_tab = self.tabs.tab("Time")
+        tk.CTkLabel(
+            time_tab, text="Time Management", font=("Arial", 11, "bold")
+        ).pack(pady=(5, 0))
+        self.time_mode = tk.StringVar(value="Depth")
+        tk.CTkSegmentedButton(
+            time_tab,
+            values=["Depth", "Clock"],
+            variable=self.time_mode,
+            command=self.toggle_time_mode,
+        ).pack(pady=5, padx=10, fill="x")
+        tk.CTkLabel(
+            time_tab,
+            text="Depth: always search to depth 18\nClock: budget from our remaining time",
+            font=("Arial", 10),
+            justify="left",
+        ).pack(padx=20, anchor="w")
+
+        self.increment_var = tk.IntVar(value=0)
+        self.increment_label = tk.CTkLabel(time_tab, text="Increment: 0s")
+        self.increment_label.pack(pady=(10, 0))
+        tk.CTkSlider(
+            time_tab,
+            from_=0,
+            to=30,
+            number_of_steps=30,
+            variable=self.increment_var,
+            command=self.update_increment_ui,
+        ).pack(fill="x", padx=20)
+
+        # -- Perf Tab --
+        perf_tab = self.tabs.tab("Perf")
+        self.trace_var = tk.BooleanVar(value=False)
+        tk.CTkSwitch(
+            perf_tab,
+            text="Latency tracing (trace.jsonl)",
+            variable=self.trace_var,
+            command=self.toggle_tracing,
+        ).pack(pady=8, padx=30, anchor="w")
+        self.perf_label = tk.CTkLabel(
+            perf_tab,
+            text="Tracing off",
+            font=("Consolas", 10),
+            justify="left",
+        )
+        self.perf_label.pack(padx=20, anchor="w")
+        self.engine_label = tk.CTkLabel(
+            perf_tab,
+            text="Engine restarts: 0",
+            font=("Consolas", 10),
+            justify="left",
+        )
+        self.engine_label.pack(padx=20, pady=(8, 0), anchor="w")
+
         # 5. Log
         self.log_box = LogBox(self.root)
 
@@ -251,9 +515,80 @@ class ChessBotGUI:
     def update_speed_ui(self, _=None):
         val = round(self.speed_var.get(), 1)
         self.speed_label.configure(text=f"Min Wait: {val}s")
+        if self.board is None:
+            return
         self.board.min_wait = val
         self.board.max_wait = val + 4.0
 
+    def game_running(self):
+        # The loop may still be finishing its tick after STOP
+        return self.playing or (self.thread is not None and self.thread.is_alive())
+
+    def load_book(self):
+        path = filedialog.askopenfilename(
+            title="Select Polyglot book", filetypes=[("Polyglot book", "*.bin")]
+        )
+        if not path or self.board is None:
+            return
+        if self.game_running():
+            # The game thread may be reading the current book
+            self.pending_book = path
+            self.book_label.configure(text=f"{os.path.basename(path)} (next START)")
+            self.log_box.add_line("Opening book is loaded at the next START.")
+            return
+        self.apply_book(path)
+
+    def apply_book(self, path):
+        try:
+            self.board.loadBook(
+                path, self.book_depth_var.get(), self.book_weighted_var.get()
+            )
+            self.book_label.configure(text=os.path.basename(path))
+            self.log_box.add_line("Opening book loaded.")
+        except Exception as e:
+            self.log_box.add_line(f"Book failed: {str(e)}")
+
+    def load_tablebase(self):
+        path = filedialog.askdirectory(title="Select Syzygy folder")
+        if not path or self.board is None:
+            return
+        if self.game_running():
+            # The engine can't take options mid-search, and the game thread
+            # may be probing the current tables
+            self.pending_tablebase = path
+            self.tablebase_label.configure(text=f"{os.path.basename(path)} (next START)")
+            self.log_box.add_line("Syzygy tables are loaded at the next START.")
+            return
+        self.apply_tablebase(path)
+
+    def apply_tablebase(self, path):
+        try:
+            self.board.loadTablebase(path)
+            self.tablebase_label.configure(
+                text=f"{os.path.basename(path)} ({self.board.tablebase.pieces} pieces)"
+            )
+            self.log_box.add_line("Syzygy tables loaded.")
+        except Exception as e:
+            self.log_box.add_line(f"Tablebase failed: {str(e)}")
+
+    def update_book_ui(self, _=None):
+        depth = int(self.book_depth_var.get())
+        self.book_depth_label.configure(text=f"Book Depth: {depth} moves")
+        if self.board and self.board.book:
+            self.board.book.depth = depth
+            self.board.book.weighted = self.book_weighted_var.get()
+
+    def toggle_time_mode(self, value):
+        if self.board is not None:
+            self.board.timeMode = value.lower()
+        self.log_box.add_line(f"Time management: {value}")
+
+    def update_increment_ui(self, _=None):
+        val = int(self.increment_var.get())
+        self.increment_label.configure(text=f"Increment: {val}s")
+        if self.board is not None:
+            self.board.increment = val
+
     def toggle_mode(self, value):
         if value == "Elo":
             self.level_slider.configure(from_=100, to=3000)
@@ -263,7 +598,136 @@ class ChessBotGUI:
             self.level_var.set(12)
         self.update_level_ui()
 
+    def toggle_detection(self):
+        if self.board is not None:
+            self.board.eventDriven = self.event_var.get()
+            self.board.boardVersion = None
+        mode = "event-driven" if self.event_var.get() else "polling"
+        self.log_box.add_line(f"Opponent detection: {mode}")
+
+    def toggle_ponder(self):
+        if self.board is not None:
+            self.board.ponderEnabled = self.ponder_var.get()
+        state = "on" if self.ponder_var.get() else "off"
+        self.log_box.add_line(f"Pondering {state}")
+
+    def update_multipv_ui(self, _=None):
+        val = int(self.multipv_var.get())
+        self.multipv_label.configure(text=f"Live lines (MultiPV): {val}")
+
+    def toggle_tracing(self):
+        if self.board is not None:
+            self.board.tracer.enable(self.trace_var.get())
+        state = "on" if self.trace_var.get() else "off"
+        self.log_box.add_line(f"Latency tracing {state}")
+
+    def update_perf(self):
+        percentiles = self.board.tracer.percentiles()
+        if not percentiles:
+            return
+        lines = [f"{'stage':<16}{'p50 ms':>9}{'p95 ms':>9}"]
+        for stage, (p50, p95) in percentiles.items():
+            lines.append(f"{stage:<16}{p50:>9.1f}{p95:>9.1f}")
+        self.perf_label.configure(text="\n".join(lines))
+
+    def post(self, kind, payload=None):
+        """
+        Queues a GUI update from any thread.
+        """
+        self.events.put((kind, payload))
+
+    def pump_events(self):
+        """
+        Applies queued events on the Tk thread. All log lines of a batch go into
+        the text box in one insert, for state updates only the latest one counts.
+        """
+        try:
+            lines = []
+            latest = {}
+            while True:
+                try:
+                    kind, payload = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "log":
+                    lines.append(payload)
+                else:
+                    latest[kind] = payload
+
+            if lines:
+                self.log_box.add_lines(lines)
+            if "ready" in latest:
+                self.board_ready(latest["ready"])
+            if "castling" in latest:
+                self.castling_indicator.configure(text=latest["castling"])
+            if "turn" in latest:
+                self.show_turn()
+            if "lifecycle" in latest and self.playing:
+                self.show_lifecycle(latest["lifecycle"])
+            if "live" in latest:
+                self.show_live(latest["live"])
+            if "stats" in latest:
+                with self.board.tracer.span("gui_update"):
+                    self.show_stats(latest["stats"])
+            if "perf" in latest:
+                self.update_perf()
+            if "stopped" in latest:
+                self.stop_game()
+        finally:
+            # A failing handler is reported by Tk, the pump keeps running
+            self.root.after(self.pump_interval, self.pump_events)
+
+    def show_lifecycle(self, state):
+        text, color = self.lifecycle_labels.get(state, ("PLAYING", "#4CAF50"))
+        self.status_label.configure(text=text, text_color=color)
+
+    def show_stats(self, stats):
+        self.stats.update_ponder(*stats["ponder"])
+        self.stats.update_cache(*stats["cache"])
+        engine = stats["engine"]
+        text = (
+            f"Engine restarts: {engine['restarts']} "
+            f"({engine['crashes']} crashes, {engine['timeouts']} timeouts)"
+        )
+        if engine["last_recovery_ms"] is not None:
+            text += f"\nRecovery: last {engine['last_recovery_ms']:.0f} ms, mean {engine['mean_recovery_ms']:.0f} ms"
+        self.engine_label.configure(text=text)
+        if stats["wdl"]:
+            self.stats.update(stats["wdl"])
+
+            # Update Eval Progress
+            eval_val = stats["wdl"][0] / 1000 + stats["wdl"][1] / 2000
+            self.progress_bar.set(eval_val)
+            self.progress_label.configure(
+                text=f"Evaluation: {round(eval_val * 100, 1)}%"
+            )
+
+    def show_live(self, live):
+        """
+        Shows the lines of the search in progress, see `engine.LiveAnalysis`.
+        """
+        rows = []
+        for line in live["lines"]:
+            score = line["score"]
+            if score["type"] == "mate":
+                value = f"#{score['value']}"
+            else:
+                value = f"{score['value'] / 100:+.2f}"
+            rows.append(f"{line['multipv']}. {value:>6}  {' '.join(line['pv'][:6])}")
+        self.pv_label.configure(text=f"Depth {live['depth']}\n" + "\n".join(rows))
+
+        wdl = live["lines"][0]["wdl"]
+        if wdl:
+            self.stats.update(wdl)
+            eval_val = wdl[0] / 1000 + wdl[1] / 2000
+            self.progress_bar.set(eval_val)
+            self.progress_label.configure(
+                text=f"Evaluation: {round(eval_val * 100, 1)}% (depth {live['depth']})"
+            )
+
     def manual_turn_set(self, value):
+        if self.board is None:
+            return
         turn_code = "w" if value == "White" else "b"
         self.board.setTurn(turn_code)
         self.turn_indicator.configure(text=f"Turn: {value}")
@@ -275,6 +739,11 @@ class ChessBotGUI:
         self.playing = True
         self.status_label.configure(text="PLAYING", text_color="#4CAF50")
         self.start_btn.configure(state="disabled")
+        self.start_time = time.perf_counter()
+
+        if self.thread is not None:
+            # The previous loop stops within a tick, it must not see the new settings
+            self.thread.join(5)
 
         # Apply settings
         self.board.initializeStockfish()
@@ -282,6 +751,13 @@ class ChessBotGUI:
             self.board.setEloLevel(int(self.level_var.get()))
         else:
             self.board.setSkillLevel(int(self.level_var.get()))
+        self.board.setMultiPV(int(self.multipv_var.get()))
+        if self.pending_book:
+            self.apply_book(self.pending_book)
+            self.pending_book = None
+        if self.pending_tablebase:
+            self.apply_tablebase(self.pending_tablebase)
+            self.pending_tablebase = None
 
         self.log_box.add_line("Bot starting...")
         self.thread = threading.Thread(target=self.game_loop, daemon=True)
@@ -291,45 +767,73 @@ class ChessBotGUI:
         self.playing = False
         self.status_label.configure(text="IDLE", text_color="#888888")
         self.start_btn.configure(state="normal")
-        self.board.playing = False
+        if self.board is not None:
+            self.board.playing = False
+            self.board.stopSearch()
         self.log_box.add_line("Bot stopped.")
 
     def game_loop(self):
+        states = self.board.lifecycle
         try:
-            if self.board.turn == "w":
-                self.log_box.add_line("Initial move (White)...")
-                self.board.play()
-
+            # The watcher may be from before STOP, rescan the board right away
+            self.board.markChanged()
+            states.moveTo(lifecycle.waiting_for_game)
+            previous = states.state
             while self.playing:
-                if self.board.hasOponentMoved() or keyboard.is_pressed("e"):
-                    self.castling_indicator.configure(text=self.board.castlingString)
-                    self.log_box.add_line("Thinking...")
-
-                    move = self.board.play()
-                    self.log_box.add_line(f"Move made: {move}")
-
-                    # Update Stats
-                    stats = self.board.getStats()
-                    self.stats.update(stats["wdl"])
-
-                    # Update Eval Progress
-                    eval_val = stats["wdl"][0] / 1000 + stats["wdl"][1] / 2000
-                    self.progress_bar.set(eval_val)
-                    self.progress_label.configure(
-                        text=f"Evaluation: {round(eval_val * 100, 1)}%"
-                    )
-
-                    # Check for new game
-                    if self.board.newGame():
-                        self.log_box.add_line("New game detected.")
-                        self.identify_state()
-
-                time.sleep(0.5)
+                state, move = self.board.tick(0.5, forced=keyboard.is_pressed("e"))
+                if state is not None:
+                    self.lifecycle_changed(previous, state)
+                    previous = state
+                if move is None:
+                    continue
+                self.first_move_made()
+                source = (self.board.lastAnalysis or {}).get("source", "engine")
+                self.post("castling", self.board.castlingString)
+                self.post(
+                    "log",
+                    f"Move made: {move} [{source}] "
+                    f"({self.board.lastMoveReads} DOM reads)",
+                )
+
+                # Stats from the search that produced the move
+                stats = self.board.getStats()
+                stats["ponder"] = (self.board.ponderHits, self.board.ponderMisses)
+                stats["cache"] = (self.board.cache.hits, self.board.cache.misses)
+                stats["engine"] = self.board.game.metrics()
+                self.post("stats", stats)
+                if self.board.tracer.enabled:
+                    self.post("perf")
         except Exception as e:
-            self.log_box.add_line(f"Error: {str(e)}")
-            self.stop_game()
+            self.post("log", f"Error: {str(e)}")
+            self.post("stopped")
+        finally:
+            states.moveTo(lifecycle.idle)
+
+    def lifecycle_changed(self, previous, state):
+        """
+        Reports a lifecycle transition made by `BoardHTML.tick`, `previous` is the
+        state reported before.
+        """
+        playing = (lifecycle.our_turn, lifecycle.opponent_turn)
+        if state == lifecycle.game_over:
+            self.post("log", "Game over, starting a new one.")
+        elif state in playing and previous not in playing:
+            color = "White" if self.board.turn == "w" else "Black"
+            self.post("log", f"Game detected, playing {color}.")
+            self.post("turn")
+        self.post("lifecycle", state)
+
+    def first_move_made(self):
+        if self.start_time is None:
+            return
+        elapsed = time.perf_counter() - self.start_time
+        self.start_time = None
+        self.post("log", f"First move {elapsed:.2f}s after start")
+        print(f"Time to first move: {elapsed:.3f}s")
 
     def login(self):
+        if self.board is None:
+            return
         self.log_box.add_line("Attempting login...")
         try:
             self.board.login()
@@ -338,14 +842,22 @@ class ChessBotGUI:
             self.log_box.add_line(f"Login failed: {str(e)}")
 
     def identify_state(self):
+        if self.board is None:
+            return
         self.board.identifyTurn()
+        self.show_turn()
+
+    def show_turn(self):
         turn_text = "White" if self.board.turn == "w" else "Black"
         self.turn_indicator.configure(text=f"Turn: {turn_text}")
         self.castling_indicator.configure(text=self.board.castlingString)
         self.log_box.add_line(f"State synced. Turn: {turn_text}")
 
     def new_game(self):
-        self.board.newGame()
+        if self.board is None:
+            return
+        # The cached snapshot is the game thread's and may be old while idle
+        self.board.newGame(fresh=True)
         self.log_box.add_line("Force new game triggered.")
 
 
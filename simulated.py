@@ -0,0 +1,167 @@
+"""
+Browser-free board for self-play runs.
+
+`SimulatedBoard` implements the board I/O of `ChessBoard` on an in-memory
+`chess.Board`: snapshots in the same shape as `snapshot_js`, clicks in the
+same board coordinates as chess.com, running clocks and a game over dialog.
+The opponent is a second engine, or random legal moves without one. It moves
+as soon as the bot waits for a board change, so the game loop, castling
+tracking and new game handling run as fast as the engines allow.
+"""
+
+import random
+import time
+
+import chess
+
+from stockChessBot import ChessBoard
+
+
+class SimulatedBoard(ChessBoard):
+    """
+    In-memory board the bot plays on against `opponent`.
+
+    Attributes:
+    - color: The bot's color. A game as black starts with the board flipped, like
+      on chess.com, until `identifyTurn` turns it back.
+    - opponent: Engine with `setPosition` and `analyse`, such as `engine.Engine`
+      or `uci.PooledEngine`. None plays random legal moves.
+    - opponentLimits: `go` parameters of the opponent's searches.
+    - alternate: Swap colors at every new game.
+    - games: Finished games as {"result", "termination", "color", "moves"}.
+    """
+
+    size = 800
+
+    def __init__(
+        self,
+        opponent=None,
+        color=chess.WHITE,
+        opponentLimits=None,
+        clock=60000,
+        clockIncrement=0,
+        alternate=True,
+        seed=None,
+    ):
+        super().__init__()
+        self.opponent = opponent
+        self.opponentLimits = opponentLimits or {"depth": 8}
+        self.clock = clock
+        self.clockIncrement = clockIncrement
+        self.alternate = alternate
+        self.rng = random.Random(seed)
+        self.games = []
+        self.color = color
+        self.reset()
+
+    def reset(self):
+        self.position = chess.Board()
+        self.flipped = self.color == chess.BLACK
+        self.result = None
+        self.termination = None
+        self.times = {chess.WHITE: self.clock, chess.BLACK: self.clock}
+        self.turnStarted = time.perf_counter()
+        self.opponentNewGame = True
+        self.changed = True
+
+    def push(self, move):
+        side = self.position.turn
+        now = time.perf_counter()
+        self.times[side] -= (now - self.turnStarted) * 1000
+        self.turnStarted = now
+        if self.times[side] <= 0:
+            self.finish("0-1" if side == chess.WHITE else "1-0", "time")
+            return
+        self.times[side] += self.clockIncrement
+        self.position.push(move)
+        outcome = self.position.outcome(claim_draw=True)
+        if outcome is not None:
+            self.finish(outcome.result(), outcome.termination.name.lower())
+
+    def finish(self, result, termination):
+        self.result = result
+        self.termination = termination
+        # The game over dialog is a change the page reports
+        self.changed = True
+
+    def opponentMove(self) -> chess.Move:
+        if self.opponent is None:
+            return self.rng.choice(list(self.position.legal_moves))
+        moves = [move.uci() for move in self.position.move_stack]
+        self.opponent.setPosition(chess.STARTING_FEN, moves, self.opponentNewGame)
+        self.opponentNewGame = False
+        return chess.Move.from_uci(self.opponent.analyse(self.opponentLimits)["move"])
+
+    def clockStrings(self):
+        def clockText(ms):
+            seconds = max(0, ms) / 1000
+            return f"{int(seconds // 60)}:{seconds % 60:04.1f}"
+
+        # Whoever is at the bottom has the bottom clock
+        top = chess.WHITE if self.flipped else chess.BLACK
+        return [clockText(self.times[top]), clockText(self.times[not top])]
+
+    def getBoardSnapshot(self):
+        self.domReads += 1
+        with self.tracer.span("dom_snapshot"):
+            pieces = [
+                f"{'w' if piece.color else 'b'}{piece.symbol().lower()}"
+                f"{chess.square_file(square) + 1}{chess.square_rank(square) + 1}"
+                for square, piece in self.position.piece_map().items()
+            ]
+            return {
+                "pieces": pieces,
+                "clocks": self.clockStrings(),
+                "board": [0, 0, self.size, self.size],
+                "scroll": [0, 0],
+                "layout": 0,
+                "present": True,
+                "flipped": self.flipped,
+                "gameOver": self.result is not None,
+            }
+
+    def movePiece(self, x, y, target_x, target_y, promotion=None):
+        move = chess.Move(chess.square(x, 7 - y), chess.square(target_x, 7 - target_y))
+        if promotion:
+            move.promotion = chess.Piece.from_symbol(promotion).piece_type
+        if self.result is not None or not self.position.is_legal(move):
+            raise ValueError(f"Illegal move {move.uci()} in {self.position.fen()}")
+        self.push(move)
+
+    def waitForBoardChange(self, timeout=0.5):
+        changed, self.changed = self.changed, False
+        if not changed and self.result is None and self.position.turn != self.color:
+            self.push(self.opponentMove())
+            self.changed = False
+            changed = True
+        if changed:
+            self.state.invalidate()
+        else:
+            time.sleep(timeout)
+        return changed
+
+    def watching(self):
+        return True
+
+    def markChanged(self):
+        self.changed = True
+
+    def newGame(self, fresh=False):
+        if self.result is None:
+            return False
+        self.games.append(
+            {
+                "result": self.result,
+                "termination": self.termination,
+                "color": "w" if self.color == chess.WHITE else "b",
+                "moves": [move.uci() for move in self.position.move_stack],
+            }
+        )
+        if self.alternate:
+            self.color = not self.color
+        self.reset()
+        return True
+
+    def flipBoard(self):
+        self.flipped = not self.flipped
+        self.changed = True
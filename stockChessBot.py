@@ -15,25 +15,65 @@ The script consists of the following classes and functions:
 To use this script, you need to have the Stockfish chess engine installed and provide the correct file path to the Stockfish executable. You also need to have the necessary Python libraries installed: stockfish, pyautogui, PIL, imagehash, cv2, numpy, pyscreeze, skimage, selenium, and keyboard.
 """
 
-import stockfish as st
-import re
+import abc
 import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.actions.action_builder import ActionBuilder
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 import os
 import shutil
 from dotenv import load_dotenv
 import random
+import threading
+import concurrent.futures
+from engine import Engine
+from uci import EngineLoop, EnginePool, PooledEngine
+from supervisor import EngineSupervisor
+from cache import AnalysisCache
+from book import OpeningBook
+from tablebase import Tablebase
+from game import GameModel
+from compactBoard import CompactBoard
+from tracing import Tracer
+import lifecycle
+from lifecycle import GameLifecycle
+from tune import loadProfile
 
 load_dotenv()
 
 
 # Resolve the final path (may be None if not found)
 stockfish_path = "./stockfish"
+analysis_cache_path = os.environ.get("analysis_cache", "analysis_cache.sqlite")
+book_path = os.environ.get("book_path")
+# Syzygy table directories, separated like the engine's `SyzygyPath`
+syzygy_path = os.environ.get("syzygy_path")
+# Number of engine processes in the shared async pool, 0 keeps the single
+# `stockfish` wrapper engine
+engine_pool_size = int(os.environ.get("engine_pool", "0"))
+# "selenium" goes through chromedriver, "cdp" talks to Chrome's DevTools
+# websocket directly for snapshots, moves and change notifications
+browser_transport = os.environ.get("transport", "selenium")
+# Threads and Hash picked for this machine by `python tune.py`
+engine_profile_path = os.environ.get("engine_profile", "engine_profile.json")
+# Seconds a search may run before the supervisor stops it, or replaces a hung engine
+engine_timeout = float(os.environ.get("engine_timeout", "30"))
+
+shared_loop = None
+shared_pool = None
+shared_pool_lock = threading.Lock()
+
+
+# Snapshot tokens of the starting position
+start_tokens = (
+    [f"w{piece}{file}1" for file, piece in enumerate("rnbqkbnr", start=1)]
+    + [f"wp{file}2" for file in range(1, 9)]
+    + [f"bp{file}7" for file in range(1, 9)]
+    + [f"b{piece}{file}8" for file, piece in enumerate("rnbqkbnr", start=1)]
+)
 
 
 piece_mapping = {
@@ -52,6 +92,226 @@ piece_mapping = {
 }
 
 
+# Collects every piece, the clocks, the board geometry and what the game lifecycle
+# needs (game over dialog, orientation) in a single WebDriver round trip.
+# Pieces come back as compact "<piece><square>" tokens, e.g. "wp52". "layout" is
+# bumped by the page whenever the window is resized or scrolled or the board
+# element is replaced, see `BoardGeometry`.
+snapshot_js = """
+const element = document.querySelector("wc-chess-board");
+if (!window.__chessbotLayout) {
+    const layout = { version: 0, board: null };
+    const moved = () => { layout.version += 1; };
+    window.addEventListener("resize", moved, { passive: true });
+    window.addEventListener("scroll", moved, { passive: true });
+    window.__chessbotLayout = layout;
+}
+const layout = window.__chessbotLayout;
+if (layout.board !== element) {
+    layout.board = element;
+    layout.version += 1;
+}
+const coordinates = document.querySelector(".coordinates");
+const rect = coordinates ? coordinates.getBoundingClientRect() : null;
+const pieces = [];
+for (const element of document.querySelectorAll("div[class*=piece]")) {
+    const attr = element.getAttribute("class");
+    if (!attr) continue;
+    const square = attr.match(/square-(\\d\\d)/);
+    const piece = attr.match(/\\b[bw][prnbqk]\\b/);
+    if (square && piece) pieces.push(piece[0] + square[1]);
+}
+const clocks = Array.from(
+    document.querySelectorAll("span[data-cy='clock-time'].clock-time-monospace"),
+    (element) => element.textContent.trim(),
+);
+return {
+    pieces: pieces,
+    clocks: clocks,
+    board: rect && [
+        rect.left + window.scrollX,
+        rect.top + window.scrollY,
+        rect.width,
+        rect.height,
+    ],
+    scroll: [window.scrollX, window.scrollY],
+    layout: layout.version,
+    present: !!element,
+    flipped: !!element && element.classList.contains("flipped"),
+    gameOver: !!document.querySelector("div[class*=game-over]"),
+};
+"""
+
+
+# Installs MutationObservers that bump a version counter whenever the set of
+# pieces or the board's orientation changes, or the game over dialog comes or goes.
+# Returns the current version (an observer already on this board keeps counting),
+# or null when there is no board on the page.
+watch_js = """
+const board = document.querySelector("wc-chess-board");
+if (!board) return null;
+const previous = window.__chessbotWatch;
+if (previous && previous.board === board) return previous.version;
+if (previous) {
+    previous.observer.disconnect();
+    previous.pageObserver.disconnect();
+}
+
+const signature = () => {
+    const pieces = [];
+    for (const element of board.querySelectorAll("div[class*=piece]")) {
+        const attr = element.getAttribute("class") || "";
+        const square = attr.match(/square-(\\d\\d)/);
+        const piece = attr.match(/\\b[bw][prnbqk]\\b/);
+        if (square && piece) pieces.push(piece[0] + square[1]);
+    }
+    const flipped = board.classList.contains("flipped");
+    const over = !!document.querySelector("div[class*=game-over]");
+    return `${pieces.sort().join(",")}|${flipped}|${over}`;
+};
+
+const state = { board: board, version: 0, signature: signature(), waiters: [], timer: null };
+const settle = () => {
+    // Captures and animations arrive as several mutations, settle them first
+    clearTimeout(state.timer);
+    state.timer = setTimeout(() => {
+        const current = signature();
+        if (current === state.signature) return;
+        state.signature = current;
+        state.version += 1;
+        const waiters = state.waiters;
+        state.waiters = [];
+        for (const notify of waiters) notify(state.version);
+        // Pushes the change to the CDP transport, if it is connected
+        if (window.__chessbotChanged) window.__chessbotChanged(String(state.version));
+    }, 20);
+};
+state.observer = new MutationObserver(settle);
+state.observer.observe(board, {
+    subtree: true,
+    childList: true,
+    attributes: true,
+    attributeFilter: ["class"],
+});
+// The game over dialog is added outside the board, only additions and
+// removals of elements are watched there
+state.pageObserver = new MutationObserver((mutations) => {
+    if (mutations.some((m) => m.target !== board && !board.contains(m.target))) settle();
+});
+state.pageObserver.observe(document.body, { subtree: true, childList: true });
+window.__chessbotWatch = state;
+return state.version;
+"""
+
+
+# Resolves with the board version as soon as it differs from arguments[0], or
+# after arguments[1] milliseconds. Resolves with -1 if the observer is gone.
+wait_js = """
+const [since, timeout, done] = arguments;
+const state = window.__chessbotWatch;
+if (!state || !state.board.isConnected) {
+    done(-1);
+    return;
+}
+if (state.version !== since) {
+    done(state.version);
+    return;
+}
+const timer = setTimeout(() => {
+    state.waiters = state.waiters.filter((waiter) => waiter !== notify);
+    done(state.version);
+}, timeout);
+const notify = (version) => {
+    clearTimeout(timer);
+    done(version);
+};
+state.waiters.push(notify);
+"""
+
+
+# Current board version, or -1 if the watched board is gone
+version_js = """
+const state = window.__chessbotWatch;
+return state && state.board.isConnected ? state.version : -1;
+"""
+
+binding_name = "__chessbotChanged"
+
+
+def findStockfish() -> str:
+    """
+    Returns `stockfish_path`, or the Stockfish on PATH if it isn't there.
+    """
+    # Ensure we have a valid path to the Stockfish binary before initializing
+    if not stockfish_path or not os.path.isfile(stockfish_path):
+        # final attempt to locate in PATH
+        found = shutil.which("stockfish") or shutil.which("stockfish.exe")
+        if found:
+            return found
+        raise FileNotFoundError(
+            "Stockfish binary not found."
+        )
+    return stockfish_path
+
+
+def engineParameters() -> dict:
+    """
+    Stockfish options for the bot's engine, with Threads and Hash from the tuned
+    profile when there is one.
+    """
+    parameters = {"Threads": 2, "Minimum Thinking Time": 30}
+    profile = loadProfile(engine_profile_path)
+    if profile:
+        parameters["Threads"] = profile["Threads"]
+        parameters["Hash"] = profile["Hash"]
+    return parameters
+
+
+def sharedPool(size=None):
+    """
+    Returns the (EngineLoop, EnginePool) shared by the bot and the analysis
+    features, starting `size` engines (default `engine_pool_size`) on first use.
+    """
+    global shared_loop, shared_pool
+    with shared_pool_lock:
+        if shared_pool is None:
+            shared_loop = EngineLoop()
+            size = size or max(1, engine_pool_size)
+            options = {}
+            profile = loadProfile(engine_profile_path)
+            if profile:
+                # The profile is for one engine, the pool shares its threads
+                options = {"Threads": max(1, profile["Threads"] // size), "Hash": profile["Hash"]}
+            pool = EnginePool(findStockfish(), size, options)
+            shared_pool = shared_loop.run(pool.start())
+        return shared_loop, shared_pool
+
+
+def startEngine():
+    """
+    Starts the engine the bot plays with: a `PooledEngine` when `engine_pool` is
+    set, otherwise a `stockfish` wrapper `Engine` with a warm standby. Either way it
+    runs under an `EngineSupervisor`. Doesn't need a browser, so it can run while
+    Chrome is starting.
+    """
+    if engine_pool_size > 0:
+        loop, pool = sharedPool()
+        # The pool replaces dead processes itself, a standby would only hold a core
+        return EngineSupervisor(
+            lambda: PooledEngine(pool, loop, depth=18), timeout=engine_timeout, standby=False
+        )
+    # Resolved once, restarts use the same binary
+    path = findStockfish()
+    parameters = engineParameters()
+    print(f"Engine: Threads {parameters['Threads']}, Hash {parameters.get('Hash', 16)} MB")
+
+    def makeEngine(hashSize=None):
+        options = parameters if hashSize is None else {**parameters, "Hash": hashSize}
+        return Engine(path, depth=18, parameters=options)
+
+    return EngineSupervisor(makeEngine, timeout=engine_timeout, hashSize=parameters.get("Hash"))
+
+
 def convertMoveStringHTML(moveString):
     char_list = list(moveString)
     char_list[0] = int(ord(char_list[0]) - ord("a"))
@@ -61,211 +321,310 @@ def convertMoveStringHTML(moveString):
     return [char_list[0], char_list[1], char_list[2], char_list[3]]
 
 
+def bookAnalysis(moveString):
+    """
+    Wraps a book move in the same shape as `Engine.analyse` results.
+    """
+    return {
+        "move": moveString,
+        "ponder": None,
+        "score": None,
+        "wdl": None,
+        "pv": [moveString],
+        "depth": 0,
+        "nodes": 0,
+        "source": "book",
+    }
+
+
 def convertTimeString_millisecons(time_string: str) -> int:
-    minutes, seconds = map(int, time_string.split(":"))
-    milliseconds = minutes * 60000 + seconds * 1000
-    return milliseconds
+    # Handles "1:05", "1:00:00" and the tenths shown when low on time, "0:09.8"
+    seconds = 0.0
+    for part in time_string.split(":"):
+        seconds = seconds * 60 + float(part)
+    return int(seconds * 1000)
 
 
-class BoardHTML(webdriver.Chrome):
+class BoardState:
+    """
+    Holds one board snapshot per tick so every consumer shares a single DOM read.
+    It must be invalidated explicitly after our own move or a detected DOM change.
     """
-    Represents a chess board in HTML format.
 
-    Attributes:
-    - position: A dictionary representing the current position of the chess pieces on the board.
-    - size: A dictionary representing the size of the chess board.
+    def __init__(self, board):
+        self.board = board
+        self.invalidate()
 
-    Methods:
-    - findBoard(): Finds the chess board element on the webpage.
-    - getBoardAsFen(turn): Returns the current position of the chess board in FEN notation.
-    - movePiece(x, y, target_x, target_y): Moves a chess piece from the specified position to the target position on the board.
+    def invalidate(self):
+        self._snapshot = None
+        self._board = None
+
+    def snapshot(self):
+        if self._snapshot is None:
+            # Counted in the board's `domReads`
+            self._snapshot = self.board.getBoardSnapshot()
+        return self._snapshot
+
+    def compact(self):
+        if self._board is None:
+            self._board = self.board.getBoardArray(self.snapshot())
+        return self._board
+
+
+# Pieces of chess.com's promotion window, from the promotion square towards the
+# middle of the board
+promotion_order = "qnrb"
+
+
+class BoardGeometry:
+    """
+    Viewport centres of the 64 squares by board coordinates (see
+    `convertMoveStringHTML`, white at the bottom), so playing a move needs no
+    element lookups or arithmetic. The table is built from a snapshot and kept
+    until the page reports a resize or scroll ("layout"), or the board is flipped
+    or moves on the page (side panels and dialogs can shift it without either).
     """
 
     def __init__(self):
-        super().__init__()
+        self.key = None
+        self.centres = None
+        self.builds = 0
+
+    def invalidate(self):
+        self.key = None
+
+    def centresFor(self, snapshot, rect=None):
+        """
+        The table for `snapshot`. `rect` ([x, y, width, height] in page coordinates)
+        overrides the board rectangle of the snapshot.
+        """
+        rect = rect or snapshot["board"]
+        key = (snapshot.get("layout"), snapshot["flipped"], tuple(rect))
+        if key[0] is None or key != self.key:
+            self.centres = self.build(rect, snapshot["scroll"], snapshot["flipped"])
+            self.key = key
+            self.builds += 1
+        return self.centres
+
+    @staticmethod
+    def build(rect, scroll, flipped):
+        x, y, width, height = rect
+        # Input events take viewport coordinates
+        left = x - scroll[0]
+        top = y - scroll[1]
+        centres = []
+        for row in range(8):
+            for column in range(8):
+                if flipped:
+                    screenColumn, screenRow = 7 - column, 7 - row
+                else:
+                    screenColumn, screenRow = column, row
+                centres.append(
+                    (
+                        round(left + (screenColumn + 0.5) * width / 8),
+                        round(top + (screenRow + 0.5) * height / 8),
+                    )
+                )
+        return centres
+
+    def clicks(self, x, y, target_x, target_y, promotion=None) -> list:
+        """
+        The points to click for a move, with the promotion piece if there is one.
+        """
+        centres = self.centres
+        points = [centres[y * 8 + x], centres[target_y * 8 + target_x]]
+        if promotion:
+            # The window opens on the promotion square and runs towards the middle
+            step = 1 if target_y == 0 else -1
+            row = target_y + step * promotion_order.index(promotion)
+            points.append(centres[row * 8 + target_x])
+        return points
+
+
+class ChessBoard(abc.ABC):
+    """
+    The bot's side of a game, independent of where the board is: the game model,
+    the engine, pondering, the book and the cache, castling tracking and the game
+    lifecycle. It only sees the board through the board I/O methods below.
+    """
 
-        self.previousFen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    def __init__(self):
+        self.previousBoard = CompactBoard.fromTokens(start_tokens, piece_mapping)
+        self.lastOpponentMove = None
         self.turn = "w"
+        # Our color is read once per game (or set by hand), the board is turned
+        # back afterwards
+        self.colorKnown = False
         self.castlingRights = [True, True, True, True]
         self.castlingString = "KQkq"
         self.skillLevel = 12
         self.elo = 3000
         self.min_wait = 2
         self.max_wait = 8
-        self.get("https://www.chess.com/play/computer")
+        # "depth" searches to a fixed depth, "clock" hands our clock to the engine
+        self.timeMode = "depth"
+        self.increment = 0
+        self.moveOverhead = 500
+        # Snapshot cache shared by every consumer within one tick
+        self.state = BoardState(self)
+        self.domReads = 0
+        self.readsAtLastMove = 0
+        self.lastMoveReads = 0
+        self.lastAnalysis = None
+        # Principal variations shown while searching, and a `LiveAnalysis` that
+        # receives the engine's info lines (set by the GUI)
+        self.multiPV = 1
+        self.liveAnalysis = None
+        # Pondering on the opponent's time
+        self.ponderEnabled = True
+        self.ponderExpected = None
+        self.ponderHits = 0
+        self.ponderMisses = 0
+        # Move-by-move model of the game, the source of every FEN sent to the engine
+        self.model = GameModel()
+        # Idle, waiting for a game, whose turn it is or game over, see `updateLifecycle`
+        self.lifecycle = GameLifecycle()
+        # Per-stage latency spans, off unless switched on from the GUI
+        self.tracer = Tracer()
+        # Analysis results by position and engine settings, persisted to disk
+        self.cache = AnalysisCache(analysis_cache_path)
+        self.strength = "default"
+        # Polyglot opening book, consulted before the cache and the engine
+        self.book = None
+        self.movesPlayed = 0
+        if book_path and os.path.isfile(book_path):
+            self.loadBook(book_path)
+        # Syzygy tables, probed before the cache and the engine in the endgame
+        self.tablebase = None
+        if syzygy_path:
+            try:
+                self.loadTablebase(syzygy_path)
+            except FileNotFoundError as e:
+                print(e)
         self.playing = False
+        # Set when a change was seen outside `tick`, e.g. during a search
+        self.rescan = False
 
-    def __del__(self):
-        if hasattr(self, "game"):
-            del self.game
-        self.quit()
+    # Board I/O, implemented by `BoardHTML` on chess.com and by
+    # `simulated.SimulatedBoard` in memory
 
-    def findBoard(self):
+    @abc.abstractmethod
+    def getBoardSnapshot(self) -> dict:
         """
-        Finds the chess board element on the webpage.
+        Reads the board in one go. Returns a dict with "pieces" (tokens such as
+        "wp52"), "clocks" (top, bottom), "board" ([x, y, width, height]), "scroll"
+        ([x, y]), "layout" (a counter, see `BoardGeometry`), "present", "flipped"
+        and "gameOver".
+        Consumers should go through `self.state` instead.
         """
-        svg_element = self.find_element(By.CLASS_NAME, "coordinates")
-        self.location = svg_element.location
-        self.size = svg_element.size
 
-    def getBoardArray(self):
+    @abc.abstractmethod
+    def movePiece(self, x, y, target_x, target_y, promotion=None):
         """
-        Returns the current position as a 2D array.
+        Clicks the piece at board coordinates (x, y) and then the target square,
+        see `convertMoveStringHTML`, then the `promotion` piece ("q", "n", "r" or
+        "b") if the move promotes.
         """
-        elements = self.find_elements(By.CSS_SELECTOR, "div[class*=piece]")
-        b = [["_" for _ in range(8)] for _ in range(8)]
-        for element in elements:
-            attr = element.get_attribute("class")
-            if not attr or "square" not in attr:
-                continue
-            pos = re.search(r"square-(\d+)", attr)
-            piece_match = re.findall(r"[bw][a-z]", attr)
-            if pos and piece_match:
-                p_code = pos.group(1)
-                piece = piece_match[0].strip()
-                x = int(p_code[0]) - 1
-                y = 8 - int(p_code[1])
-                b[y][x] = piece_mapping[piece]
-        return b
-
-    def getBoardAsFen(self):
+
+    @abc.abstractmethod
+    def waitForBoardChange(self, timeout=0.5) -> bool:
         """
-        Returns the current position of the chess board in FEN notation.
+        Blocks until the board changes or `timeout` seconds pass. Returns whether
+        it may have changed, the snapshot is invalidated if so.
         """
-        b = self.getBoardArray()
-        fen = ""
-        for row in b:
-            empty_count = 0
-            for square in row:
-                if square == "_":
-                    empty_count += 1
-                else:
-                    if empty_count > 0:
-                        fen += str(empty_count)
-                        empty_count = 0
-                    fen += square
-            if empty_count > 0:
-                fen += str(empty_count)
-            fen += "/"
-        fen = fen[:-1]
-        return f"{fen} {self.turn} {self.castlingString} - 0 1"
 
-    def movePiece(self, x, y, target_x, target_y):
+    def watching(self) -> bool:
         """
-        Moves a chess piece from the specified position to the target position on the board.
+        Whether `waitForBoardChange` reports real changes, rather than sleeping.
         """
-        self.findBoard()
-        Wdx = self.size["width"] / 8
-        Hdx = self.size["height"] / 8
-        centerX = self.location["x"] + Wdx / 2 + x * Wdx
-        centerY = self.location["y"] + Hdx / 2 + y * Hdx
+        return False
 
-        targetCenter_x = self.location["x"] + Wdx / 2 + target_x * Wdx
-        targetCenter_y = self.location["y"] + Hdx / 2 + target_y * Hdx
+    @abc.abstractmethod
+    def markChanged(self):
+        """
+        Makes the next `waitForBoardChange` return True right away.
+        """
 
-        actions = ActionChains(self, duration=100)
-        actions.move_by_offset(centerX, centerY)
-        actions.click()
-        actions.move_by_offset(-centerX, -centerY)
-        actions.move_by_offset(targetCenter_x, targetCenter_y)
-        actions.click()
-        actions.move_by_offset(-targetCenter_x, -targetCenter_y)
-        actions.perform()
-        
-        self.previousFen = self.getBoardAsFen()
-        self.CastlingUpdate()
+    @abc.abstractmethod
+    def newGame(self, fresh=False) -> bool:
+        """
+        Starts a new game from the game over dialog. Returns whether there was one.
+        `tick` checks the snapshot it has just read, callers from other threads
+        pass `fresh` to read the page themselves and leave `self.state` alone.
+        """
 
-    def initializeStockfish(self):
-        # Ensure we have a valid path to the Stockfish binary before initializing
-        if not stockfish_path or not os.path.isfile(stockfish_path):
-            # final attempt to locate in PATH
-            found = shutil.which("stockfish") or shutil.which("stockfish.exe")
-            if found:
-                resolved = found
-            else:
-                raise FileNotFoundError(
-                    "Stockfish binary not found."
-                )
-        else:
-            resolved = stockfish_path
+    @abc.abstractmethod
+    def flipBoard(self):
+        """
+        Turns the board around, so that white is at the bottom again.
+        """
 
+    def getBoardArray(self, snapshot=None):
+        """
+        Returns the current position as a 64-byte CompactBoard.
+        """
+        if snapshot is None:
+            return self.state.compact()
+        return CompactBoard.fromTokens(snapshot["pieces"], piece_mapping)
+
+    def getBoardAsFen(self, snapshot=None):
+        """
+        Returns the current position of the chess board in FEN notation.
+        """
+        fen = self.getBoardArray(snapshot).placement()
+        return f"{fen} {self.turn} {self.castlingString} - 0 1"
+
+    def initializeStockfish(self, engine=None):
+        """
+        Attaches `engine` if one was started in the background, otherwise starts one.
+        """
         if not hasattr(self, "game"):
-            self.game = st.Stockfish(
-                resolved, depth=18, parameters={"Threads": 2, "Minimum Thinking Time": 30}
-            )
+            self.game = engine if engine is not None else startEngine()
+            if self.tablebase:
+                self.game.setSyzygyPath(self.tablebase.path)
 
-    def CastlingUpdate(self):
+    def CastlingUpdate(self, b=None):
         """
         Updates castling rights by comparing the current board state with the starting positions of Kings and Rooks.
         """
-        b = self.getBoardArray()
+        if b is None:
+            b = self.getBoardArray()
         # White King
-        if b[7][4] != "K":
+        if b["e1"] != "K":
             self.castlingRights[0] = False
             self.castlingRights[1] = False
         # White Rooks
-        if b[7][7] != "R": self.castlingRights[0] = False
-        if b[7][0] != "R": self.castlingRights[1] = False
-        
+        if b["h1"] != "R": self.castlingRights[0] = False
+        if b["a1"] != "R": self.castlingRights[1] = False
+
         # Black King
-        if b[0][4] != "k":
+        if b["e8"] != "k":
             self.castlingRights[2] = False
             self.castlingRights[3] = False
         # Black Rooks
-        if b[0][7] != "r": self.castlingRights[2] = False
-        if b[0][0] != "r": self.castlingRights[3] = False
+        if b["h8"] != "r": self.castlingRights[2] = False
+        if b["a8"] != "r": self.castlingRights[3] = False
 
         self.updateCastlingString()
 
-    def login(self):
-        self.get("https://www.chess.com/login")
-
-        # Read credentials from environment (support common var names)
-        username = os.environ.get("chess_username")
-        password = os.environ.get("chess_password")
-        if not username or not password:
-            raise EnvironmentError(
-                "Missing credentials: set 'username' and 'password' environment variables."
-            )
-
-        wait = WebDriverWait(self, 10)
-        try:
-            # Prefer the visible/login-specific inputs
-            user_input = wait.until(
-                EC.element_to_be_clickable((By.ID, "login-username"))
-            )
-            pass_input = wait.until(
-                EC.element_to_be_clickable((By.ID, "login-password"))
-            )
-        except TimeoutException:
-            raise RuntimeError(
-                "Login inputs not found or not interactable on the login page"
-            )
-
-        user_input.clear()
-        user_input.send_keys(username)
-        pass_input.clear()
-        pass_input.send_keys(password)
-
-        # Click the login button when it's clickable
-        try:
-            login_btn = wait.until(EC.element_to_be_clickable((By.ID, "login")))
-            login_btn.click()
-        except TimeoutException:
-            raise RuntimeError("Login button not found or not clickable")
-
     def hasOponentMoved(self):
-        new = self.getBoardAsFen().split(" ")[0]
-        self.CastlingUpdate()
-        if new != self.previousFen.split(" ")[0]:
-            self.previousFen = new
-            return True
-        else:
-            self.previousFen = new
+        """
+        Compares the board with the previous tick. When it changed, the opponent's
+        move inferred from the difference is kept in `lastOpponentMove`.
+        """
+        new = self.getBoardArray()
+        self.CastlingUpdate(new)
+        if new == self.previousBoard:
             return False
+        self.lastOpponentMove = self.previousBoard.diff(new)
+        self.previousBoard = new
+        if self.lifecycle.state == lifecycle.opponent_turn:
+            self.lifecycle.moveTo(lifecycle.our_turn)
+        return True
 
     def setTurn(self, turn):
         self.turn = turn
+        self.colorKnown = True
         print("Turn set to: ", turn)
 
     def updateCastlingRights(self, n):
@@ -284,98 +643,635 @@ class BoardHTML(webdriver.Chrome):
             self.castlingString = "-"
 
     def setSkillLevel(self, level):
+        self.stopPondering()
         self.skillLevel = level
+        # Skill 20 is the engine's own full strength, keyed like the batch analysis
+        self.strength = "default" if level == 20 else f"skill {level}"
         self.game.set_skill_level(level)
 
     def setEloLevel(self, level):
+        self.stopPondering()
         self.elo = level
+        self.strength = f"elo {level}"
         self.game.set_elo_rating(level)
 
+    def setMultiPV(self, lines):
+        self.stopPondering()
+        self.multiPV = lines
+        self.game.setMultiPV(lines)
+
     def endGame(self):
+        self.stopPondering()
         del self.game
         print("Game ended")
 
     def resetStockfish(self):
-        self.game = st.Stockfish(
-            stockfish_path,
-            depth=18,
-            parameters={"Threads": 2, "Minimum Thinking Time": 30},
-        )
-        print("Stockfish restarted")
+        """
+        Swaps in a fresh engine with the same binary, strength and position.
+        """
+        self.ponderExpected = None
+        if not hasattr(self, "game"):
+            self.initializeStockfish()
+            return
+        self.game.restart("reset")
+
+    def syncModel(self):
+        """
+        Advances the game model to the position on the page, resetting it from the DOM
+        FEN when the position can't be reached with one move. Returns True if reset.
+        """
+        move, self.lastOpponentMove = self.lastOpponentMove, None
+        if self.model.sync(self.getBoardArray().placement(), self.turn, move):
+            self.castlingString = self.model.castlingString()
+            return False
+        print("Game model out of sync, rebuilding it from the board")
+        self.model.reset(self.getBoardAsFen())
+        return True
 
     def play(self) -> str | None:
-        self.findBoard()
-        fen = self.getBoardAsFen()
-        self.game.set_fen_position(fen)
-        print(self.game.get_board_visual())
+        move_id = self.movesPlayed + 1
+        # The response wait counts from reading the position, the search overlaps it
+        started = time.perf_counter()
+        self.state.snapshot()
+        with self.tracer.span("fen_build", move=move_id):
+            resynced = self.syncModel()
+            fen = self.model.fen()
+        book_move = self.book.lookup(fen, self.movesPlayed) if self.book else None
+        # A book or tablebase move is played without a search
+        known = bookAnalysis(book_move) if book_move else None
+        if known is None and self.tablebase:
+            known = self.tablebase.lookup(fen)
+        settings = self.engineSettings()
+        key = AnalysisCache.makeKey(fen, settings) if settings else None
+        cached = None if known or key is None else self.cache.get(key)
+
+        pondered = False
+        if self.ponderExpected is not None:
+            pondered = fen.split(" ")[0] == self.ponderExpected
+            if pondered:
+                self.ponderHits += 1
+            else:
+                self.ponderMisses += 1
+                self.game.stopPonder()
+            self.ponderExpected = None
+            print(f"Ponder {'hit' if pondered else 'miss'}, rate: {self.ponderHitRate():.0%}")
+        if (known or cached) and pondered:
+            self.game.stopPonder()
+
+        if not pondered and not cached and not known:
+            self.game.setPosition(self.model.rootFen, self.model.moves, resynced)
+            print(fen)
         black_time, white_time = self.get_current_player_time()
-        self.waitRandomTime()
-        t1 = time.perf_counter()
-        movestring = self.game.get_best_move()
-        t2 = time.perf_counter()
-        print(f"Get best move: {t2 - t1:0.4f} seconds")
+        delay = self.randomWaitTime(black_time if self.turn == "b" else white_time)
+        source = known["source"] if known else "cache" if cached else "ponder" if pondered else "engine"
+        if self.liveAnalysis is not None:
+            self.liveAnalysis.reset()
+        with self.tracer.span(
+            "engine_search", move=move_id, source=source, wait_ms=round(delay * 1000)
+        ):
+            search = None
+            if known:
+                self.lastAnalysis = known
+            elif cached:
+                self.lastAnalysis = {**cached, "source": source}
+            elif pondered:
+                search = self.game.submitPonderHit(self.liveAnalysis)
+            else:
+                limits = self.searchLimits(black_time, white_time)
+                search = self.game.submit(limits, self.liveAnalysis)
+            if not self.finishWait(search, started + delay):
+                print("Board changed during the search, move dropped")
+                return None
+            if search is not None:
+                self.lastAnalysis = {**search.result(), "source": source}
+        if self.liveAnalysis is not None:
+            self.liveAnalysis.flush()
+        if key is not None:
+            print(f"Analysis cache {'hit' if cached else 'miss'}, rate: {self.cache.hitRate():.0%}")
+        movestring = self.lastAnalysis["move"]
         print(movestring)
-        t1 = time.perf_counter()
-        bestmove = convertMoveStringHTML(movestring)
-        self.movePiece(*bestmove)
-        t2 = time.perf_counter()
-        print(f"Move piece: {t2 - t1:0.4f} seconds")
+        if movestring is None:
+            return None
+        with self.tracer.span("move_actuation", move=move_id, uci=movestring):
+            self.makeMove(movestring)
+        # Written after the clicks, so the disk write doesn't delay the move
+        if key is not None and not cached and not known and self.searchComplete(self.lastAnalysis):
+            self.cache.put(key, self.lastAnalysis)
+
+        self.lastMoveReads = self.domReads - self.readsAtLastMove
+        self.readsAtLastMove = self.domReads
+        print(f"DOM reads this move: {self.lastMoveReads}")
 
+        self.model.push(movestring)
+        self.movesPlayed += 1
+        if self.lifecycle.state == lifecycle.our_turn:
+            self.lifecycle.moveTo(lifecycle.opponent_turn)
+        self.startPondering()
         return movestring
 
+    def makeMove(self, movestring):
+        """
+        Plays `movestring` on the board and takes the position it leaves as the
+        one to compare the opponent's move against.
+        """
+        self.movePiece(*convertMoveStringHTML(movestring), movestring[4:] or None)
+        # Our own move changed the board, read it once more
+        self.state.invalidate()
+        self.previousBoard = self.getBoardArray()
+        self.CastlingUpdate()
+
+    def finishWait(self, search, deadline):
+        """
+        Blocks until `search` (a future, None for book and cache moves) is done and
+        the response wait ending at `deadline` (a `perf_counter` time) has passed, so
+        a move takes the longer of the two instead of their sum. With the board
+        watcher installed the board is watched meanwhile; if the pieces change the
+        search is stopped and False returned, the move would be for a gone position.
+        """
+        watching = self.watching()
+        while True:
+            remaining = deadline - time.perf_counter()
+            searching = search is not None and not search.done()
+            if not searching and remaining <= 0:
+                return True
+            if not watching:
+                if searching:
+                    concurrent.futures.wait([search])
+                else:
+                    time.sleep(remaining)
+                continue
+            if remaining > 0:
+                changed = self.waitForBoardChange(min(remaining, 1.0))
+            else:
+                # Only the search is left, notice its end right away
+                concurrent.futures.wait([search], 0.05)
+                changed = self.waitForBoardChange(0)
+            if changed:
+                if search is not None:
+                    self.game.stop()
+                    concurrent.futures.wait([search])
+                # The wait took the change, the next tick handles it without waiting
+                self.rescan = True
+                return False
+
+    def stopSearch(self):
+        """
+        Interrupts a running search from another thread, e.g. when the bot is stopped.
+        """
+        if hasattr(self, "game"):
+            self.game.stop()
+
+    def loadBook(self, path, depth=12, weighted=True):
+        """
+        Only call while the game loop isn't running, `play` reads the book.
+        """
+        self.stopPondering()
+        if self.book:
+            self.book.close()
+        self.book = OpeningBook(path, depth, weighted)
+        print("Opening book loaded: ", path)
+
+    def loadTablebase(self, path):
+        """
+        Only call while the game loop isn't running: `play` probes the tables, and
+        the engine can't take options during a search.
+        """
+        tablebase = Tablebase(path)
+        self.stopPondering()
+        if self.tablebase:
+            self.tablebase.close()
+        self.tablebase = tablebase
+        # The engine uses the same tables inside its search
+        if hasattr(self, "game"):
+            self.game.setSyzygyPath(path)
+        print(f"Syzygy tables loaded ({tablebase.pieces} pieces): ", path)
+
+    def engineSettings(self):
+        """
+        Describes everything besides the position that changes the engine's answer.
+        None in clock mode, where the answer depends on the time left and the
+        cache isn't used.
+        """
+        if self.timeMode == "clock":
+            return None
+        settings = self.strength
+        if self.multiPV > 1:
+            settings += f"; multipv {self.multiPV}"
+        if self.tablebase:
+            settings += "; syzygy"
+        return f"{settings}; depth {self.game.depth}"
+
+    def searchComplete(self, analysis) -> bool:
+        """
+        Whether `analysis` reached the depth it was asked for. A search cut short
+        by STOP or the watchdog plays its best move so far, but isn't cached.
+        """
+        return (analysis.get("depth") or 0) >= int(self.game.depth)
+
+    def searchLimits(self, black_time, white_time):
+        """
+        Turns the clocks into UCI `go` parameters in clock mode, None means a fixed depth search.
+        `moveOverhead` for moving the piece in the browser is taken off our clock. The
+        response wait runs alongside the search, so it isn't.
+        """
+        if self.timeMode != "clock" or white_time is None or black_time is None:
+            return None
+        spent = self.moveOverhead
+        if self.turn == "w":
+            white_time = max(white_time - spent, 50)
+        else:
+            black_time = max(black_time - spent, 50)
+        increment = int(self.increment * 1000)
+        return {"wtime": white_time, "btime": black_time, "winc": increment, "binc": increment}
+
+    def startPondering(self):
+        """
+        Searches the reply expected by the PV on the opponent's time.
+        """
+        reply = self.lastAnalysis["ponder"]
+        if not self.ponderEnabled or not reply:
+            return
+        self.ponderExpected = self.model.placementAfter(reply)
+        limits = self.searchLimits(*self.get_current_player_time())
+        self.game.startPonder(self.model.rootFen, self.model.moves + [reply], limits)
+
+    def stopPondering(self):
+        if hasattr(self, "game"):
+            self.game.stopPonder()
+        self.ponderExpected = None
+
+    def ponderHitRate(self):
+        total = self.ponderHits + self.ponderMisses
+        return self.ponderHits / total if total else 0.0
+
     def getStats(self):
-        wdl = self.game.get_wdl_stats()
-        return {"wdl": wdl, **self.game.get_evaluation()}
+        """
+        Returns the WDL and evaluation of the last search without searching again.
+        Like `Stockfish.get_evaluation`, the evaluation is relative to white.
+        """
+        analysis = self.lastAnalysis or {}
+        score = analysis.get("score") or {"type": "cp", "value": 0}
+        compare = 1 if self.turn == "w" else -1
+        return {
+            "wdl": analysis.get("wdl"),
+            "type": score["type"],
+            "value": score["value"] * compare,
+        }
 
     def get_current_player_time(self):
         """Returns the top most player's time as the first element
         and the bottom player's time as the second element"""
-        curr_time = self.find_elements(
-            By.CSS_SELECTOR, "span[data-cy='clock-time'].clock-time-monospace"
-        )
-        if len(curr_time) > 0:
-            top_time = convertTimeString_millisecons(curr_time[0].text)
-            bottom_time = convertTimeString_millisecons(curr_time[1].text)
+        curr_time = self.state.snapshot()["clocks"]
+        if len(curr_time) > 1:
+            top_time = convertTimeString_millisecons(curr_time[0])
+            bottom_time = convertTimeString_millisecons(curr_time[1])
 
             print(top_time, bottom_time)
 
             return top_time, bottom_time
         return None, None
 
-    def newGame(self):
-        if self.find_elements(By.CSS_SELECTOR, "div[class*=game-over]"):
-            # click new game button
-            self.find_element(
-                By.XPATH, '//button[@data-cy="game-over-modal-new-game-button"]'
-            ).click()
-            self.castlingRights = [True, True, True, True]
-            self.castlingString = "KQkq"
-            # locate when the new game starts
-            while not self.find_element(By.XPATH, "//wc-chess-board"):
-                pass
-            self.identifyTurn()
-            return True
-        return False
+    def tick(self, timeout=0.5, forced=False):
+        """
+        One pass of the game loop: waits up to `timeout` seconds for the board to
+        change, advances the lifecycle (asking for a new game when one ends) and
+        plays a move on our turn, or right away if `forced`.
+        A turn of ours that begins during the tick is returned first and played by
+        the next tick, which doesn't wait. Returns (the lifecycle state if the tick
+        changed it or None, the move played or None).
+        """
+        before = self.lifecycle.state
+        rescan, self.rescan = self.rescan, False
+        if rescan or self.waitForBoardChange(timeout):
+            if self.updateLifecycle() == lifecycle.game_over:
+                self.newGame()
+            if self.lifecycle.playing:
+                self.hasOponentMoved()
+        move = None
+        if forced or before == lifecycle.our_turn == self.lifecycle.state:
+            move = self.play()
+        elif self.lifecycle.state == lifecycle.our_turn:
+            # Our turn just began: report it first, the next tick plays without waiting
+            self.rescan = True
+        after = self.lifecycle.state
+        return (after if after != before else None), move
 
-    def identifyTurn(self):
-        element = self.find_element(By.XPATH, "//wc-chess-board")
-        class_name = element.get_attribute("class")
+    def updateLifecycle(self):
+        """
+        Advances `lifecycle` from the current snapshot. Called after every board
+        change, the snapshot is the one the tick reads anyway. Returns the new
+        state, or None if it didn't change.
+        """
+        snapshot = self.state.snapshot()
+        before = self.lifecycle.state
+        if self.lifecycle.playing and snapshot["gameOver"]:
+            self.stopPondering()
+            self.lifecycle.moveTo(lifecycle.game_over)
+        elif before == lifecycle.game_over and not snapshot["gameOver"]:
+            self.resetGame()
+            self.lifecycle.moveTo(lifecycle.waiting_for_game)
+        if (
+            self.lifecycle.state == lifecycle.waiting_for_game
+            and snapshot["present"]
+            and not snapshot["gameOver"]
+        ):
+            if not self.colorKnown:
+                self.identifyTurn(snapshot["flipped"])
+            # Also right when resuming a game after STOP: it is our move if the
+            # model says so or the opponent moved since our last move
+            ours = (
+                self.model.turn == self.turn
+                or self.getBoardArray().placement() != self.model.placement()
+            )
+            self.lifecycle.moveTo(lifecycle.our_turn if ours else lifecycle.opponent_turn)
+        return self.lifecycle.state if self.lifecycle.state != before else None
 
-        if class_name is None:
-            print("Board not found")
-            return
+    def resetGame(self):
+        self.castlingRights = [True, True, True, True]
+        self.castlingString = "KQkq"
+        self.movesPlayed = 0
+        self.model.reset()
+        self.previousBoard = CompactBoard.fromTokens(start_tokens, piece_mapping)
+        self.lastOpponentMove = None
+        self.colorKnown = False
+        self.stopPondering()
 
-        turn = "w"
+    def identifyTurn(self, flipped=None):
+        """
+        Sets our color from the board's orientation, read from a fresh snapshot
+        unless `flipped` is given. A flipped board is turned back with `flipBoard`,
+        the move coordinates assume white at the bottom.
+        """
+        if flipped is None:
+            snapshot = self.getBoardSnapshot()
+            if not snapshot["present"]:
+                print("Board not found")
+                return
+            flipped = snapshot["flipped"]
 
-        if "board" in class_name and "flipped" not in class_name:
-            turn = "w"
-        elif "board flipped" in class_name:
+        turn = "w"
+        if flipped:
             turn = "b"
-            # press x on the keyboard
-            self.find_element(By.XPATH, "//body").send_keys("x")
+            self.flipBoard()
 
         self.setTurn(turn)
 
-    def waitRandomTime(self):
+    def randomWaitTime(self, our_time=None):
+        """
+        Returns a random response time between `min_wait` and `max_wait`, the least
+        time a move takes. In clock mode the wait is capped to a small share of our
+        remaining time so it can't lose on time.
+        """
         sleepTime = self.min_wait + random.random() * (self.max_wait - self.min_wait)
-        time.sleep(sleepTime)
+        if self.timeMode == "clock" and our_time is not None:
+            sleepTime = min(sleepTime, our_time / 1000 / 40)
+        return sleepTime
+
+
+class BoardHTML(ChessBoard, webdriver.Chrome):
+    """
+    Represents a chess board in HTML format.
+
+    Attributes:
+    - position: A dictionary representing the current position of the chess pieces on the board.
+    - size: A dictionary representing the size of the chess board.
+
+    Methods:
+    - findBoard(): Finds the chess board element on the webpage.
+    - getBoardAsFen(turn): Returns the current position of the chess board in FEN notation.
+    - movePiece(x, y, target_x, target_y): Moves a chess piece from the specified position to the target position on the board.
+    """
+
+    def __init__(self, url="https://www.chess.com/play/computer", options=None, transport=None):
+        webdriver.Chrome.__init__(self, options=options)
+        ChessBoard.__init__(self)
+
+        # Event-driven opponent detection, falls back to polling when disabled or broken
+        self.eventDriven = True
+        self.boardVersion = None
+        # Square centres, rebuilt only when the page layout changes
+        self.geometry = BoardGeometry()
+        self.get(url)
+        self.transport = transport or browser_transport
+        self.cdp = None
+        if self.transport == "cdp":
+            self.connectCdp()
+
+    def connectCdp(self):
+        """
+        Opens the DevTools websocket of this window, see `cdp.CdpTransport`.
+        """
+        # Imported here so trio is only loaded when the transport is used
+        from cdp import CdpTransport
+
+        address = self.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        self.cdp = CdpTransport(address, target_id=self.current_window_handle)
+        self.cdp.addBinding(binding_name)
+        print("Connected to DevTools at", address)
+
+    def runScript(self, script, *args):
+        """
+        `execute_script` over the active transport.
+        """
+        if self.cdp is not None:
+            from cdp import CdpError
+
+            try:
+                return self.cdp.evaluate(script, *args)
+            except CdpError as e:
+                self.dropCdp(e)
+        return self.execute_script(script, *args)
+
+    def dropCdp(self, error):
+        """
+        Closes a failed DevTools transport, everything goes through chromedriver after.
+        """
+        print("DevTools transport failed, falling back to Selenium: ", error.msg)
+        self.cdp.close()
+        self.cdp = None
+
+    def quit(self):
+        if self.cdp is not None:
+            self.cdp.close()
+            self.cdp = None
+        super().quit()
+
+    def __del__(self):
+        if hasattr(self, "game"):
+            del self.game
+        self.quit()
+
+    def getBoardSnapshot(self):
+        """
+        Reads all pieces, the clocks, the board geometry and the lifecycle fields
+        with one script call, see `ChessBoard.getBoardSnapshot`.
+        Always hits the DOM, consumers should go through `self.state` instead.
+        """
+        self.domReads += 1
+        with self.tracer.span("dom_snapshot"):
+            return self.runScript(snapshot_js)
+
+    def findBoard(self, snapshot=None):
+        """
+        Finds the chess board element on the webpage.
+        """
+        if snapshot is None:
+            snapshot = self.state.snapshot()
+        if not snapshot["board"]:
+            # Let Selenium raise its usual NoSuchElementException
+            self.domReads += 1
+            svg_element = self.find_element(By.CLASS_NAME, "coordinates")
+            self.location = svg_element.location
+            self.size = svg_element.size
+            return
+        x, y, width, height = snapshot["board"]
+        self.location = {"x": x, "y": y}
+        self.size = {"width": width, "height": height}
+
+    def movePiece(self, x, y, target_x, target_y, promotion=None):
+        """
+        Moves a chess piece from the specified position to the target position on
+        the board, clicking the promotion piece as well if one is given. All clicks
+        go out as one input sequence. Promotions expect chess.com's "Always promote
+        to queen" setting to be off, so the promotion window opens.
+        """
+        snapshot = self.state.snapshot()
+        rect = None
+        if not snapshot["board"]:
+            self.findBoard(snapshot)
+            location, size = self.location, self.size
+            rect = [location["x"], location["y"], size["width"], size["height"]]
+        self.geometry.centresFor(snapshot, rect)
+        points = self.geometry.clicks(x, y, target_x, target_y, promotion)
+
+        if self.cdp is not None:
+            from cdp import CdpError
+
+            try:
+                self.cdp.clickMany(points)
+                return
+            except CdpError as e:
+                self.dropCdp(e)
+        # Absolute moves without a duration, sent in one WebDriver request
+        actions = ActionBuilder(self, duration=0)
+        for point_x, point_y in points:
+            actions.pointer_action.move_to_location(point_x, point_y).click()
+        actions.perform()
+
+    def login(self):
+        self.get("https://www.chess.com/login")
+
+        # Read credentials from environment (support common var names)
+        username = os.environ.get("chess_username")
+        password = os.environ.get("chess_password")
+        if not username or not password:
+            raise EnvironmentError(
+                "Missing credentials: set 'username' and 'password' environment variables."
+            )
+
+        wait = WebDriverWait(self, 10)
+        try:
+            # Prefer the visible/login-specific inputs
+            user_input = wait.until(
+                EC.element_to_be_clickable((By.ID, "login-username"))
+            )
+            pass_input = wait.until(
+                EC.element_to_be_clickable((By.ID, "login-password"))
+            )
+        except TimeoutException:
+            raise RuntimeError(
+                "Login inputs not found or not interactable on the login page"
+            )
+
+        user_input.clear()
+        user_input.send_keys(username)
+        pass_input.clear()
+        pass_input.send_keys(password)
+
+        # Click the login button when it's clickable
+        try:
+            login_btn = wait.until(EC.element_to_be_clickable((By.ID, "login")))
+            login_btn.click()
+        except TimeoutException:
+            raise RuntimeError("Login button not found or not clickable")
+
+    def watchBoard(self):
+        """
+        Installs the MutationObserver that reports piece changes on the board and
+        continues from its version. Returns False if there is no board on the page yet.
+        """
+        self.boardVersion = self.runScript(watch_js)
+        if self.cdp is not None:
+            self.cdp.resetBinding(binding_name)
+        return self.boardVersion is not None
+
+    def nextBoardVersion(self, timeout):
+        """
+        Waits up to `timeout` seconds for a board version other than `boardVersion`.
+        Returns the current version, or -1 if the watched board is gone.
+        """
+        if self.cdp is not None:
+            # The observer pushes changes through the binding, only ask the
+            # page whether the board is still there when nothing came
+            payload = self.cdp.waitForBinding(binding_name, str(self.boardVersion), timeout)
+            return int(payload) if payload else self.runScript(version_js)
+        return self.execute_async_script(wait_js, self.boardVersion, int(timeout * 1000))
+
+    def waitForBoardChange(self, timeout=0.5):
+        """
+        Blocks until the pieces on the board change or `timeout` seconds pass.
+        Returns whether the board may have changed. In polling mode this just sleeps
+        and always returns True, so the caller rescans the DOM like before.
+        """
+        if self.eventDriven:
+            try:
+                if self.boardVersion is None:
+                    # Freshly watched, rescan once so nothing before the install is missed
+                    if self.watchBoard():
+                        self.state.invalidate()
+                        return True
+                else:
+                    version = self.nextBoardVersion(timeout)
+                    if version == -1:
+                        # The board element was replaced (e.g. a new game), rewatch it
+                        self.watchBoard()
+                        self.state.invalidate()
+                        return True
+                    changed = version != self.boardVersion
+                    self.boardVersion = version
+                    if changed:
+                        self.state.invalidate()
+                    return changed
+            except WebDriverException as e:
+                print("Board watcher failed, falling back to polling: ", e.msg)
+                self.eventDriven = False
+                self.boardVersion = None
+        time.sleep(timeout)
+        self.state.invalidate()
+        return True
+
+    def watching(self):
+        return self.eventDriven and self.boardVersion is not None
+
+    def markChanged(self):
+        # Makes the next wait rewatch the board and rescan it
+        self.boardVersion = None
+
+    def flipBoard(self):
+        # press x on the keyboard
+        self.find_element(By.XPATH, "//body").send_keys("x")
+
+    def newGame(self, fresh=False):
+        """
+        Clicks the new game button of the game over dialog. The new game is picked
+        up by `updateLifecycle` once the dialog is gone. Returns whether it was clicked.
+        """
+        snapshot = self.getBoardSnapshot() if fresh else self.state.snapshot()
+        if not snapshot["gameOver"]:
+            return False
+        self.find_element(
+            By.XPATH, '//button[@data-cy="game-over-modal-new-game-button"]'
+        ).click()
+        if not fresh:
+            self.state.invalidate()
+        return True
@@ -0,0 +1,260 @@
+"""
+Keeps the bot's engine alive.
+
+A Stockfish that crashes or hangs (a bad FEN is enough) used to take the
+bot down: the exception reached `game_loop`, which stopped. `EngineSupervisor`
+sits between `ChessBoard` and the engine (`engine.Engine` or `uci.PooledEngine`)
+with the same methods. Every search runs under a watchdog, and a dead or
+stuck engine is swapped for a standby process that was started and warmed up
+in advance. The supervisor replays the strength, MultiPV and position onto
+the new engine and runs the search again, so the move only comes a little later.
+"""
+
+import concurrent.futures
+import threading
+import time
+
+from stockfish.models import StockfishException
+
+from uci import EngineError
+
+# What a dead or unresponsive engine raises
+engine_failures = (StockfishException, EngineError, OSError, concurrent.futures.TimeoutError)
+
+# Hash (MB) of the standby while it waits, it gets the full size when it takes over
+standby_hash = 16
+
+
+class WatchdogTimeout(EngineError):
+    """
+    A search neither finished nor answered `stop` in time, the engine was killed.
+    """
+
+
+class EngineSupervisor:
+    """
+    Engine made by `factory()` with a watchdog, restarts and a standby.
+
+    Attributes:
+    - timeout: Seconds a fixed depth search may take before it is stopped. Timed
+      searches get the time they were given plus `margin`. If the engine doesn't
+      answer `stop` within `grace` seconds it is killed and replaced.
+    - hashSize: The engine's Hash in MB. When set, `factory(hashSize)` has to take
+      the Hash to start with, and the standby waits with `standby_hash` instead.
+    - retries: How often one search is retried on a new engine before the error
+      is raised, so a position that always crashes the engine can't loop forever.
+    - restarts, crashes, timeouts: Counters, see `metrics`.
+    - recoveryTimes: Seconds from noticing a failure to a ready replacement.
+    """
+
+    def __init__(
+        self, factory, timeout=30, grace=1.0, retries=1, standby=True, margin=5.0, hashSize=None
+    ):
+        self.factory = factory
+        self.timeout = timeout
+        self.margin = margin
+        self.hashSize = hashSize
+        self.grace = grace
+        self.retries = retries
+        self.useStandby = standby
+        self.engine = factory()
+        self.settings = {}
+        self.position = None
+        self.ponderLimits = None
+        self.restarts = 0
+        self.crashes = 0
+        self.timeouts = 0
+        self.recoveryTimes = []
+        self.lock = threading.RLock()
+        # Searches are watched from one thread, engines are started on another
+        self.watcher = concurrent.futures.ThreadPoolExecutor(1, "engine-watchdog")
+        self.spawner = concurrent.futures.ThreadPoolExecutor(1, "engine-spawner")
+        self.standby = None
+        self.prepareStandby()
+
+    @property
+    def depth(self):
+        return self.engine.depth
+
+    @depth.setter
+    def depth(self, depth):
+        self.settings["depth"] = depth
+        self.engine.depth = depth
+
+    @property
+    def pondering(self):
+        return self.engine.pondering
+
+    def prepareStandby(self):
+        if self.useStandby and self.standby is None:
+            self.standby = self.spawner.submit(self._spawn)
+
+    def _spawn(self):
+        engine = self.factory(standby_hash) if self.hashSize else self.factory()
+        # Loads the network before the engine is needed
+        engine.warmUp(50)
+        return engine
+
+    def _takeStandby(self):
+        standby, self.standby = self.standby, None
+        if standby is not None:
+            try:
+                # Still starting is still faster than starting from scratch
+                engine = standby.result()
+                if self.hashSize:
+                    engine.setHash(self.hashSize)
+                return engine
+            except Exception as e:
+                print("Standby engine failed to start: ", e)
+        return self.factory()
+
+    def _apply(self, engine):
+        for name, value in self.settings.items():
+            if name == "depth":
+                engine.depth = value
+            else:
+                method, args = value
+                getattr(engine, method)(*args)
+        if self.position is not None:
+            engine.setPosition(*self.position, True)
+
+    def restart(self, reason="restart"):
+        """
+        Replaces the engine with the standby (or a new one) carrying the same
+        settings and position, then prepares the next standby.
+        """
+        started = time.perf_counter()
+        with self.lock:
+            old = self.engine
+            self.engine = self._takeStandby()
+            self._apply(self.engine)
+            self.restarts += 1
+            self.recoveryTimes.append(time.perf_counter() - started)
+        self.spawner.submit(self._dispose, old)
+        self.prepareStandby()
+        print(f"Engine restarted ({reason}) in {self.recoveryTimes[-1] * 1000:.0f} ms")
+
+    def _dispose(self, engine):
+        try:
+            engine.kill()
+        except Exception:
+            pass
+
+    def _call(self, method, *args):
+        try:
+            return getattr(self.engine, method)(*args)
+        except engine_failures as e:
+            self.crashes += 1
+            self.restart(f"{method} failed: {e}")
+
+    def set_skill_level(self, skill_level=20):
+        self.settings["strength"] = ("set_skill_level", (skill_level,))
+        self._call("set_skill_level", skill_level)
+
+    def set_elo_rating(self, elo_rating=1350):
+        self.settings["strength"] = ("set_elo_rating", (elo_rating,))
+        self._call("set_elo_rating", elo_rating)
+
+    def setMultiPV(self, lines):
+        self.settings["multipv"] = ("setMultiPV", (lines,))
+        self._call("setMultiPV", lines)
+
+    def setSyzygyPath(self, path):
+        self.settings["syzygy"] = ("setSyzygyPath", (path,))
+        self._call("setSyzygyPath", path)
+
+    def setPosition(self, fen, moves, newGame=False):
+        self.position = (fen, list(moves))
+        self._call("setPosition", fen, moves, newGame)
+
+    def warmUp(self, movetime=200):
+        return self.engine.warmUp(movetime)
+
+    def analyse(self, limits=None, onInfo=None):
+        return self.submit(limits, onInfo).result()
+
+    def submit(self, limits=None, onInfo=None):
+        """
+        Starts a watched search, returns a future like `Engine.submit`.
+        """
+        return self.watcher.submit(self._search, limits, onInfo, False)
+
+    def searchTimeout(self, limits) -> float:
+        """
+        Seconds a search with `limits` may take: `movetime`, or the clock of the
+        side to move (the engine never plans to use more), plus `margin`.
+        Fixed depth searches get `timeout`.
+        """
+        limits = limits or {}
+        if "movetime" in limits:
+            return limits["movetime"] / 1000 + self.margin
+        if "wtime" in limits and "btime" in limits and self.position is not None:
+            fen, moves = self.position
+            white = (fen.split(" ")[1] == "w") == (len(moves) % 2 == 0)
+            return limits["wtime" if white else "btime"] / 1000 + self.margin
+        return self.timeout
+
+    def _search(self, limits, onInfo, ponderHit):
+        timeout = self.searchTimeout(limits)
+        for attempt in range(self.retries + 1):
+            engine = self.engine
+            try:
+                if ponderHit and attempt == 0:
+                    future = engine.submitPonderHit(onInfo)
+                else:
+                    future = engine.submit(limits, onInfo)
+                return self._watch(engine, future, timeout)
+            except engine_failures as e:
+                if not isinstance(e, WatchdogTimeout):
+                    self.crashes += 1
+                if attempt == self.retries:
+                    raise
+                self.restart(f"search failed: {e or type(e).__name__}")
+
+    def _watch(self, engine, future, timeout):
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.timeouts += 1
+        # Over time, the best move so far will do if the engine still listens
+        engine.stop()
+        try:
+            return future.result(self.grace)
+        except concurrent.futures.TimeoutError:
+            engine.kill()
+            raise WatchdogTimeout(f"No answer {timeout + self.grace:g}s into the search")
+
+    def stop(self):
+        try:
+            self.engine.stop()
+        except engine_failures:
+            # Dead already, the watchdog notices it
+            pass
+
+    def startPonder(self, fen, moves, limits=None):
+        self.position = (fen, list(moves))
+        self.ponderLimits = limits
+        self._call("startPonder", fen, moves, limits)
+
+    def ponderHit(self, onInfo=None):
+        return self.submitPonderHit(onInfo).result()
+
+    def submitPonderHit(self, onInfo=None):
+        # A retry searches the pondered position normally, with the ponder limits
+        return self.watcher.submit(self._search, self.ponderLimits, onInfo, True)
+
+    def stopPonder(self):
+        self._call("stopPonder")
+
+    def kill(self):
+        self._dispose(self.engine)
+
+    def metrics(self) -> dict:
+        recovery = self.recoveryTimes
+        return {
+            "restarts": self.restarts,
+            "crashes": self.crashes,
+            "timeouts": self.timeouts,
+            "last_recovery_ms": round(recovery[-1] * 1000, 1) if recovery else None,
+            "mean_recovery_ms": round(sum(recovery) / len(recovery) * 1000, 1) if recovery else None,
+        }
@@ -0,0 +1,100 @@
+"""
+Syzygy endgame tablebase lookups, done before asking the engine.
+
+`chess.syzygy` memory-maps the `.rtbw` (win/draw/loss) and `.rtbz` (distance to
+zeroing) files, so only the pages a probe touches are read from disk. A
+position with few enough pieces is answered exactly from the tables in well
+under a millisecond, where the engine would search it to depth 18.
+"""
+
+import os
+
+import chess
+import chess.syzygy
+
+
+class Tablebase:
+    """
+    Memory-mapped Syzygy tables from one or more directories.
+
+    Attributes:
+    - path: The directories, separated by `os.pathsep` like Stockfish's `SyzygyPath`.
+    - pieces: The most pieces (kings included) any loaded table covers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = chess.syzygy.Tablebase()
+        for directory in path.split(os.pathsep):
+            if directory:
+                self.reader.add_directory(directory)
+        self.pieces = max((len(name) - 1 for name in self.reader.wdl), default=0)
+        if not self.pieces:
+            raise FileNotFoundError(f"No Syzygy tables in {path}")
+
+    def lookup(self, fen: str) -> dict | None:
+        """
+        Returns the best move for `fen` in the same shape as `Engine.analyse`
+        results, or None if the position is not in the tables.
+        """
+        board = chess.Board(fen)
+        if chess.popcount(board.occupied) > self.pieces or board.castling_rights:
+            return None
+        try:
+            ranked = [(self._rank(board, move), move) for move in board.legal_moves]
+        except KeyError:
+            # A table is missing, e.g. only some of the 5 piece tables are there
+            return None
+        if not ranked:
+            return None
+        (wdl, _, _, dtz), move = max(ranked, key=lambda entry: entry[0])
+        return tablebaseAnalysis(move.uci(), wdl, dtz)
+
+    def _rank(self, board, move):
+        """
+        Sort key for `move`, higher is better: the result first, then mate, then
+        the quickest way to convert a win (zeroing moves reset the fifty move
+        count) or the longest resistance in a loss.
+        """
+        zeroing = board.is_zeroing(move)
+        board.push(move)
+        try:
+            if board.is_checkmate():
+                return (2, True, True, 1)
+            # Both are from the opponent's side after the move
+            wdl = -self.reader.probe_wdl(board)
+            dtz = -self.reader.probe_dtz(board)
+        finally:
+            board.pop()
+        if wdl > 0:
+            return (wdl, False, zeroing, -abs(dtz))
+        if wdl < 0:
+            return (wdl, False, False, abs(dtz))
+        return (wdl, False, False, 0)
+
+    def close(self):
+        self.reader.close()
+
+
+def tablebaseAnalysis(moveString, wdl, dtz):
+    """
+    Wraps a tablebase move like `bookAnalysis`. Wins and losses get scores near
+    Stockfish's tablebase values, cursed wins and blessed losses (decided only
+    past the fifty move rule) count as draws.
+    """
+    if wdl == 2:
+        score, stats = 20000 - abs(dtz), [1000, 0, 0]
+    elif wdl == -2:
+        score, stats = -20000 + abs(dtz), [0, 0, 1000]
+    else:
+        score, stats = 0, [0, 1000, 0]
+    return {
+        "move": moveString,
+        "ponder": None,
+        "score": {"type": "cp", "value": score},
+        "wdl": stats,
+        "pv": [moveString],
+        "depth": 0,
+        "nodes": 0,
+        "source": "tablebase",
+    }
@@ -0,0 +1,114 @@
+"""
+Board watcher of `stockChessBot.BoardHTML` against a stubbed page, no browser needed.
+
+    python -m unittest test_boardwatch
+"""
+
+import os
+import time
+import unittest
+
+os.environ["analysis_cache"] = ":memory:"
+
+from cdp import CdpError
+from stockChessBot import BoardHTML, ChessBoard, version_js, wait_js, watch_js
+
+
+class FakePage:
+    """
+    The page side of `watch_js`, `wait_js` and `version_js`: one observer whose
+    version survives being watched again, like on the real page.
+    """
+
+    def __init__(self):
+        self.installed = False
+        self.version = 0
+        # Versions the page moves to while a wait is running
+        self.changes = []
+
+    def run(self, script, *args):
+        if script is watch_js:
+            self.installed = True
+            return self.version
+        if script is version_js:
+            return self.version if self.installed else -1
+        if script is wait_js:
+            since = args[0]
+            if self.changes:
+                self.version = self.changes.pop(0)
+            return self.version if self.version != since else since
+        raise AssertionError("unexpected script")
+
+
+def makeBoard(page):
+    board = BoardHTML.__new__(BoardHTML)
+    ChessBoard.__init__(board)
+    board.eventDriven = True
+    board.boardVersion = None
+    board.cdp = None
+    board.runScript = page.run
+    board.execute_async_script = page.run
+    board.quit = lambda: None
+    return board
+
+
+class WatcherTest(unittest.TestCase):
+    def test_rewatch_continues_from_the_page_version(self):
+        page = FakePage()
+        page.installed, page.version = True, 7
+        board = makeBoard(page)
+        # STOP -> START marks the board changed, the observer is still there
+        board.markChanged()
+        self.assertTrue(board.waitForBoardChange(0))
+        self.assertEqual(board.boardVersion, 7)
+        self.assertTrue(board.finishWait(None, time.perf_counter() + 0.01))
+
+    def test_change_during_the_search_drops_one_move_only(self):
+        page = FakePage()
+        board = makeBoard(page)
+        board.waitForBoardChange(0)
+        page.changes = [1]
+        self.assertFalse(board.finishWait(None, time.perf_counter() + 0.01))
+        self.assertTrue(board.rescan)
+        self.assertEqual(board.boardVersion, 1)
+        # The watcher stays installed and the next search finishes
+        self.assertTrue(board.watching())
+        self.assertTrue(board.finishWait(None, time.perf_counter() + 0.01))
+
+    def test_no_board_on_the_page(self):
+        board = makeBoard(FakePage())
+        board.runScript = lambda script, *args: None
+        self.assertFalse(board.watchBoard())
+        self.assertFalse(board.watching())
+
+
+class DeadTransport:
+    """
+    A DevTools connection that dropped, every command fails.
+    """
+
+    def __init__(self):
+        self.closed = False
+
+    def evaluate(self, script, *args):
+        raise CdpError("DevTools connection closed: closed")
+
+    def close(self):
+        self.closed = True
+
+
+class CdpFallbackTest(unittest.TestCase):
+    def test_failed_transport_falls_back_to_selenium(self):
+        page = FakePage()
+        board = BoardHTML.__new__(BoardHTML)
+        ChessBoard.__init__(board)
+        board.cdp = transport = DeadTransport()
+        board.execute_script = page.run
+        board.quit = lambda: None
+        self.assertEqual(board.runScript(watch_js), 0)
+        self.assertTrue(transport.closed)
+        self.assertIsNone(board.cdp)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Move ranking of `tablebase.Tablebase` against a fake reader, no tables needed.
+
+    python -m unittest test_tablebase
+"""
+
+import unittest
+
+import chess
+
+from tablebase import Tablebase, tablebaseAnalysis
+
+
+class FakeReader:
+    """
+    Answers probes from `results`: {uci: (wdl, dtz)} for the side that played
+    the move. Other moves are draws. Probes are made after the move, from the
+    opponent's side, like `chess.syzygy`.
+    """
+
+    def __init__(self, results, missing=False):
+        self.results = results
+        self.missing = missing
+
+    def _result(self, board):
+        if self.missing:
+            raise KeyError("table not found")
+        return self.results.get(board.peek().uci(), (0, 0))
+
+    def probe_wdl(self, board):
+        return -self._result(board)[0]
+
+    def probe_dtz(self, board):
+        return -self._result(board)[1]
+
+    def close(self):
+        pass
+
+
+def fakeTablebase(results, pieces=5, missing=False):
+    tablebase = Tablebase.__new__(Tablebase)
+    tablebase.path = "fake"
+    tablebase.reader = FakeReader(results, missing)
+    tablebase.pieces = pieces
+    return tablebase
+
+
+# White to move, no mate in one
+queen_ending = "k7/8/8/8/8/8/P7/KQ6 w - - 0 1"
+
+
+class RankingTest(unittest.TestCase):
+    def test_mate_comes_first(self):
+        fen = "7k/8/5K2/8/8/8/8/6Q1 w - - 0 1"
+        tablebase = fakeTablebase({"g1g2": (2, 1)})
+        board = chess.Board(fen)
+        board.push_uci(tablebase.lookup(fen)["move"])
+        self.assertTrue(board.is_checkmate())
+
+    def test_win_before_cursed_win_before_draw(self):
+        results = {"b1b2": (1, 120), "b1c2": (2, 30)}
+        self.assertEqual(fakeTablebase(results).lookup(queen_ending)["move"], "b1c2")
+        del results["b1c2"]
+        analysis = fakeTablebase(results).lookup(queen_ending)
+        self.assertEqual(analysis["move"], "b1b2")
+        # Decided only past the fifty move rule, reported as a draw
+        self.assertEqual(analysis["score"]["value"], 0)
+        self.assertEqual(analysis["wdl"], [0, 1000, 0])
+
+    def test_zeroing_then_shortest_dtz(self):
+        results = {"b1c2": (2, 5), "b1d3": (2, 3), "a2a3": (2, 9)}
+        self.assertEqual(fakeTablebase(results).lookup(queen_ending)["move"], "a2a3")
+        del results["a2a3"]
+        analysis = fakeTablebase(results).lookup(queen_ending)
+        self.assertEqual(analysis["move"], "b1d3")
+        self.assertEqual(analysis["score"]["value"], 20000 - 3)
+
+    def test_longest_resistance_when_lost(self):
+        fen = "k7/8/8/8/8/8/8/K6q w - - 0 1"
+        results = {"a1a2": (-2, -4), "a1b2": (-2, -12)}
+        analysis = fakeTablebase(results).lookup(fen)
+        self.assertEqual(analysis["move"], "a1b2")
+        self.assertEqual(analysis["wdl"], [0, 0, 1000])
+
+    def test_positions_outside_the_tables(self):
+        self.assertIsNone(fakeTablebase({}).lookup(chess.STARTING_FEN))
+        self.assertIsNone(fakeTablebase({}).lookup("r3k3/8/8/8/8/8/8/4K3 w q - 0 1"))
+        self.assertIsNone(fakeTablebase({}, missing=True).lookup(queen_ending))
+
+    def test_analysis_shape(self):
+        analysis = tablebaseAnalysis("e2e4", 2, -7)
+        self.assertEqual(analysis["source"], "tablebase")
+        self.assertEqual(analysis["pv"], ["e2e4"])
+        self.assertEqual(analysis["score"], {"type": "cp", "value": 19993})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Per-move latency tracing.
+
+Code wraps each stage of a move in a named span (`dom_snapshot`, `fen_build`,
+`engine_search`, `move_actuation`, `gui_update`). Finished spans are appended
+to a rotating JSONL file and to a rolling window per stage, which the GUI
+reads to show p50/p95. When tracing is off, `span` returns a shared no-op
+context manager, so instrumented code pays one attribute check.
+"""
+
+import contextlib
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from collections import deque
+
+
+null_span = contextlib.nullcontext()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "fields", "start")
+
+    def __init__(self, tracer, name, fields):
+        self.tracer = tracer
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.record(self.name, time.perf_counter() - self.start, self.fields)
+        return False
+
+
+class Tracer:
+    """
+    Collects named spans into a rotating JSONL file and rolling per-stage windows.
+
+    Attributes:
+    - enabled: Whether spans are recorded at all.
+    - window: How many recent samples per stage the percentiles are computed from.
+    """
+
+    def __init__(self, path="trace.jsonl", max_bytes=5_000_000, backups=3, window=200):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.window = window
+        self.enabled = False
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.logger = None
+
+    def enable(self, enabled=True):
+        if enabled and self.logger is None:
+            # The file is only created once tracing is switched on
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger = logging.getLogger("chessbot.trace")
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            self.logger.addHandler(handler)
+        self.enabled = enabled
+
+    def span(self, name, **fields):
+        if not self.enabled:
+            return null_span
+        return Span(self, name, fields)
+
+    def record(self, name, seconds, fields=None):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+            self.samples[name].append(seconds)
+        record = {"ts": round(time.time(), 3), "span": name, "ms": round(seconds * 1000, 3)}
+        if fields:
+            record.update(fields)
+        self.logger.info(json.dumps(record))
+
+    def percentiles(self) -> dict:
+        """
+        Returns {stage: (p50_ms, p95_ms)} over the rolling window of each stage.
+        """
+        with self.lock:
+            windows = {name: sorted(values) for name, values in self.samples.items()}
+        result = {}
+        for name, values in windows.items():
+            if values:
+                p50 = values[int(0.50 * (len(values) - 1))]
+                p95 = values[int(0.95 * (len(values) - 1))]
+                result[name] = (p50 * 1000, p95 * 1000)
+        return result
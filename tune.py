@@ -0,0 +1,185 @@
+"""
+Picks Threads and Hash for Stockfish on this machine.
+
+    python tune.py                 # tune and write engine_profile.json
+    python tune.py --depth 18      # deeper test searches, slower but steadier
+
+Threads are tuned first at a fixed hash, then Hash at the best thread count.
+Every setting runs Stockfish's `bench` for nodes per second and searches a
+fixed suite of positions to `depth` for time to depth, which is what decides:
+more threads always raise nps, but not always the depth reached in time. One
+core is left for Chrome. `BoardHTML` loads the profile at startup, see
+`stockChessBot.engineParameters`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import time
+
+from uci import UciEngine
+
+
+# Opening, middlegame and endgame positions the settings are timed on
+suite = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8",
+    "r2q1rk1/1b2bppp/p2ppn2/1p6/3NP3/1BN1B3/PPP1QPPP/R4RK1 w - - 0 12",
+    "2r2rk1/pp3ppp/2n1b3/3p4/3P4/2PB1N2/P4PPP/R4RK1 b - - 1 18",
+    "8/5pk1/6p1/3P4/1p3P2/1P4KP/8/8 w - - 0 45",
+]
+
+default_profile_path = "engine_profile.json"
+
+
+def loadProfile(path=default_profile_path) -> dict | None:
+    """
+    Returns the profile written by `tune`, or None if there is none.
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def usableCores() -> int:
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 2
+    # Leave a core for Chrome and the GUI
+    return max(1, cores - 1)
+
+
+def memoryMb() -> int | None:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def threadCandidates(cores) -> list[int]:
+    candidates = {cores}
+    threads = 1
+    while threads < cores:
+        candidates.add(threads)
+        threads *= 2
+    return sorted(candidates)
+
+
+def hashCandidates() -> list[int]:
+    candidates = [16, 64, 256, 1024, 4096]
+    memory = memoryMb()
+    if memory:
+        # Never take more than a quarter of the machine's memory
+        candidates = [size for size in candidates if size <= memory // 4] or [16]
+    return candidates
+
+
+def runBench(path, threads, hash_mb, depth=13) -> int | None:
+    """
+    Runs Stockfish's `bench` and returns its nodes per second. Stockfish prints
+    the summary on stderr, both streams are searched.
+    """
+    result = subprocess.run(
+        [path],
+        input=f"bench {hash_mb} {threads} {depth}\nquit\n",
+        capture_output=True,
+        text=True,
+    )
+    match = re.search(r"Nodes/second\s*:\s*(\d+)", result.stdout + result.stderr)
+    return int(match.group(1)) if match else None
+
+
+async def timeToDepth(path, threads, hash_mb, depth) -> float:
+    """
+    Median seconds to search the suite positions to `depth` from a fresh hash.
+    """
+    engine = await UciEngine(path, {"Threads": threads, "Hash": hash_mb}).start()
+    loop = asyncio.get_running_loop()
+    times = []
+    try:
+        for fen in suite:
+            await engine.newGame()
+            start = loop.time()
+            await engine.go(fen, limits={"depth": depth})
+            times.append(loop.time() - start)
+    finally:
+        await engine.quit()
+    return statistics.median(times)
+
+
+async def measure(path, threads, hash_mb, depth, bench_depth):
+    nps = await asyncio.to_thread(runBench, path, threads, hash_mb, bench_depth)
+    seconds = await timeToDepth(path, threads, hash_mb, depth)
+    result = {
+        "Threads": threads,
+        "Hash": hash_mb,
+        "nps": nps,
+        "time_to_depth_ms": round(seconds * 1000, 1),
+    }
+    print(
+        f"{threads:>7} {hash_mb:>6} {nps or 0:>12,} {result['time_to_depth_ms']:>12.1f}"
+    )
+    return result
+
+
+def fastest(results, tolerance=0.03):
+    # Settings within `tolerance` of the best time count as ties, which fewer
+    # threads and less hash win: they leave more of the machine to everything else
+    best = min(r["time_to_depth_ms"] for r in results)
+    close = [r for r in results if r["time_to_depth_ms"] <= best * (1 + tolerance)]
+    return min(close, key=lambda r: (r["Threads"], r["Hash"]))
+
+
+async def tune(path, depth=16, bench_depth=13, threads=None, hashes=None):
+    cores = usableCores()
+    threads = threads or threadCandidates(cores)
+    hashes = hashes or hashCandidates()
+    print(f"Tuning {path} on {cores} usable cores, suite depth {depth}")
+    print(f"{'Threads':>7} {'Hash':>6} {'nodes/s':>12} {'median ms':>12}")
+
+    base_hash = 64 if 64 in hashes else hashes[0]
+    results = [await measure(path, t, base_hash, depth, bench_depth) for t in threads]
+    best_threads = fastest(results)["Threads"]
+    for hash_mb in hashes:
+        if hash_mb != base_hash:
+            results.append(await measure(path, best_threads, hash_mb, depth, bench_depth))
+
+    best = fastest(results)
+    return {
+        **best,
+        "cores": cores,
+        "depth": depth,
+        "stockfish": path,
+        "tuned": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--depth", type=int, default=16, help="suite search depth")
+    parser.add_argument("--bench-depth", type=int, default=13)
+    parser.add_argument("--threads", type=int, nargs="+", help="thread counts to try")
+    parser.add_argument("--hash", type=int, nargs="+", help="hash sizes in MB to try")
+    parser.add_argument("--output", default=default_profile_path)
+    args = parser.parse_args()
+
+    # Imported here, it pulls in Selenium
+    from stockChessBot import findStockfish
+
+    profile = asyncio.run(
+        tune(findStockfish(), args.depth, args.bench_depth, args.threads, args.hash)
+    )
+    with open(args.output, "w") as f:
+        json.dump(profile, f, indent=2)
+    print(
+        f"Best: Threads {profile['Threads']}, Hash {profile['Hash']} MB "
+        f"({profile['time_to_depth_ms']} ms median). Written to {args.output}"
+    )
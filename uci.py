@@ -0,0 +1,443 @@
+"""
+Asynchronous UCI driver and engine pool.
+
+`UciEngine` talks to a Stockfish process over asyncio pipes, without the
+`stockfish` wrapper. A search is a `Search` object: its `info` lines can be
+streamed while it runs, it can be stopped at any moment from the event loop
+or from another thread, and awaiting it gives the same analysis dict as
+`Engine.analyse`. `EnginePool` hands out idle engines, so several searches run
+at once on a many-core machine. `PooledEngine` is the blocking front end that
+`BoardHTML` uses, it drives the pool on an `EngineLoop` thread.
+"""
+
+import asyncio
+import contextlib
+import os
+import threading
+
+import chess
+
+from engine import parseInfoLine
+
+
+class EngineError(RuntimeError):
+    """
+    The engine process exited or stopped answering.
+    """
+
+
+def emptyAnalysis() -> dict:
+    return {
+        "move": None,
+        "ponder": None,
+        "score": None,
+        "wdl": None,
+        "pv": [],
+        "depth": 0,
+        "nodes": 0,
+    }
+
+
+class Search:
+    """
+    One `go` on a `UciEngine`. Await it for the analysis dict.
+
+    Attributes:
+    - analysis: Updated from every principal `info` line while the search runs.
+    - lines: Latest `info` per `multipv` index.
+    """
+
+    def __init__(self, engine, ponder=False):
+        self.engine = engine
+        self.ponder = ponder
+        self.analysis = emptyAnalysis()
+        self.lines = {}
+        self.listeners = []
+        self.done = asyncio.get_running_loop().create_future()
+
+    def __await__(self):
+        return self.done.__await__()
+
+    def subscribe(self, callback):
+        """
+        Calls `callback(info)` on the event loop for every `info` line from now on.
+        """
+        self.listeners.append(callback)
+
+    async def stream(self):
+        """
+        Yields parsed `info` dicts until the search ends.
+        """
+        queue = asyncio.Queue()
+        self.subscribe(queue.put_nowait)
+        self.done.add_done_callback(lambda _: queue.put_nowait(None))
+        while (info := await queue.get()) is not None:
+            yield info
+
+    def stop(self):
+        if not self.done.done():
+            self.engine.send("stop")
+
+    def ponderHit(self):
+        if self.ponder and not self.done.done():
+            self.ponder = False
+            self.engine.send("ponderhit")
+
+    def _info(self, info):
+        self.lines[info.get("multipv", 1)] = info
+        if info.get("multipv", 1) == 1:
+            self.analysis["score"] = info["score"]
+            self.analysis["wdl"] = info.get("wdl", self.analysis["wdl"])
+            self.analysis["pv"] = info.get("pv", self.analysis["pv"])
+            self.analysis["depth"] = info.get("depth", self.analysis["depth"])
+            self.analysis["nodes"] = info.get("nodes", self.analysis["nodes"])
+        for callback in self.listeners:
+            callback(info)
+
+    def _bestmove(self, tokens):
+        if len(tokens) > 1 and tokens[1] != "(none)":
+            self.analysis["move"] = tokens[1]
+        if len(tokens) > 3 and tokens[2] == "ponder":
+            self.analysis["ponder"] = tokens[3]
+        if not self.done.done():
+            self.done.set_result(self.analysis)
+
+
+class UciEngine:
+    """
+    A UCI engine process driven from an asyncio event loop.
+    """
+
+    def __init__(self, path, options=None):
+        self.path = path
+        self.options = dict(options or {})
+        self.current = {}
+        self.process = None
+        self.search = None
+        self.waiters = {}
+        self.reader = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            self.path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self.reader = asyncio.create_task(self._readLines())
+        await self._command("uci", "uciok")
+        await self.configure(self.options)
+        return self
+
+    def send(self, line):
+        if self.process is None or self.process.stdin.is_closing():
+            raise EngineError(f"{self.path} is not running")
+        self.process.stdin.write(f"{line}\n".encode())
+
+    async def _command(self, line, reply):
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[reply] = waiter
+        self.send(line)
+        return await waiter
+
+    async def isReady(self):
+        await self._command("isready", "readyok")
+
+    async def configure(self, options):
+        """
+        Sends the options that differ from what the engine already has.
+        """
+        changed = False
+        for name, value in options.items():
+            if isinstance(value, bool):
+                value = "true" if value else "false"
+            if self.current.get(name) != str(value):
+                self.send(f"setoption name {name} value {value}")
+                self.current[name] = str(value)
+                changed = True
+        if changed:
+            await self.isReady()
+
+    async def newGame(self):
+        self.send("ucinewgame")
+        await self.isReady()
+
+    def go(self, fen, moves=(), limits=None, ponder=False, depth=18):
+        """
+        Starts a search on `fen` after `moves` and returns its `Search` right away.
+        `limits` are `go` parameters, without them the search runs to `depth`.
+        """
+        if self.search is not None and not self.search.done.done():
+            raise EngineError("A search is already running on this engine")
+        command = "position startpos" if fen == chess.STARTING_FEN else f"position fen {fen}"
+        if moves:
+            command += f" moves {' '.join(moves)}"
+        self.send(command)
+        command = "go ponder" if ponder else "go"
+        if limits:
+            command += "".join(f" {name} {value}" for name, value in limits.items())
+        else:
+            command += f" depth {depth}"
+        self.search = Search(self, ponder)
+        self.send(command)
+        return self.search
+
+    async def idle(self):
+        """
+        Stops the running search, if any, and waits for its `bestmove`.
+        """
+        if self.search is not None and not self.search.done.done():
+            self.search.stop()
+            await self.search
+
+    async def _readLines(self):
+        try:
+            while True:
+                raw = await self.process.stdout.readline()
+                if not raw:
+                    break
+                text = raw.decode(errors="replace").strip()
+                if text.startswith("info"):
+                    info = parseInfoLine(text)
+                    if info and self.search is not None:
+                        self.search._info(info)
+                elif text.startswith("bestmove"):
+                    if self.search is not None:
+                        self.search._bestmove(text.split())
+                elif text in self.waiters:
+                    waiter = self.waiters.pop(text)
+                    if not waiter.done():
+                        waiter.set_result(text)
+        finally:
+            error = EngineError(f"{self.path} exited")
+            for waiter in self.waiters.values():
+                if not waiter.done():
+                    waiter.set_exception(error)
+            self.waiters.clear()
+            if self.search is not None and not self.search.done.done():
+                self.search.done.set_exception(error)
+
+    async def quit(self):
+        if self.process is None:
+            return
+        with contextlib.suppress(EngineError, ConnectionError):
+            await self.idle()
+            self.send("quit")
+        try:
+            await asyncio.wait_for(self.process.wait(), 2)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+        await self.reader
+
+
+class EnginePool:
+    """
+    `size` engine processes shared by everything that searches.
+
+    Attributes:
+    - options: UCI options every engine starts with. Threads defaults to an even
+      share of the CPU cores, so a full pool doesn't oversubscribe the machine.
+    """
+
+    def __init__(self, path, size=2, options=None):
+        self.path = path
+        self.size = size
+        self.options = {"Threads": max(1, (os.cpu_count() or 2) // size)}
+        self.options.update(options or {})
+        self.engines = []
+        self.idle = None
+
+    async def start(self):
+        self.idle = asyncio.Queue()
+        self.engines = await asyncio.gather(
+            *(UciEngine(self.path, self.options).start() for _ in range(self.size))
+        )
+        for engine in self.engines:
+            self.idle.put_nowait(engine)
+        return self
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, options=None):
+        """
+        Lends an idle engine with `options` applied. A search still running when
+        the block exits is stopped before the engine goes back to the pool.
+        """
+        engine = await self.idle.get()
+        if engine.process.returncode is not None:
+            # It crashed or a watchdog killed it, lend a new one in its place
+            engine = await self.replace(engine)
+        try:
+            if options:
+                await engine.configure(options)
+            yield engine
+        finally:
+            try:
+                await asyncio.shield(engine.idle())
+            finally:
+                self.idle.put_nowait(engine)
+
+    async def replace(self, engine):
+        with contextlib.suppress(EngineError, ConnectionError):
+            await engine.quit()
+        fresh = await UciEngine(self.path, self.options).start()
+        self.engines[self.engines.index(engine)] = fresh
+        return fresh
+
+    async def warmUp(self, movetime=200):
+        """
+        Runs a short search on every engine at once, see `Engine.warmUp`.
+        Returns how long it took in seconds.
+        """
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(
+            *(
+                self.analyse(chess.STARTING_FEN, limits={"movetime": movetime})
+                for _ in self.engines
+            )
+        )
+        return asyncio.get_running_loop().time() - start
+
+    async def analyse(self, fen, moves=(), limits=None, options=None, depth=18):
+        async with self.acquire(options) as engine:
+            return await engine.go(fen, moves, limits, depth=depth)
+
+    async def close(self):
+        await asyncio.gather(*(engine.quit() for engine in self.engines))
+
+
+class EngineLoop:
+    """
+    Runs an asyncio event loop on a daemon thread for code that isn't async.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        return self.submit(coroutine).result(timeout)
+
+    def call(self, function, *args):
+        self.loop.call_soon_threadsafe(function, *args)
+
+
+class PooledEngine:
+    """
+    Blocking engine on top of an `EnginePool`, with the methods `BoardHTML` uses
+    from `Engine`. Strength settings are per instance and applied to whichever
+    pool engine runs the search.
+    """
+
+    pondering = False
+
+    def __init__(self, pool, loop, depth=18):
+        self.pool = pool
+        self.loop = loop
+        self.depth = depth
+        self.options = {"UCI_ShowWDL": True, "Ponder": True}
+        self.fen = chess.STARTING_FEN
+        self.moves = []
+        self.newGame = False
+        self.search = None
+        self.ponderLease = None
+
+    def set_skill_level(self, skill_level=20):
+        self.options.update({"UCI_LimitStrength": False, "Skill Level": skill_level})
+
+    def set_elo_rating(self, elo_rating=1350):
+        self.options.update({"UCI_LimitStrength": True, "UCI_Elo": elo_rating})
+
+    def setMultiPV(self, lines):
+        self.options["MultiPV"] = lines
+
+    def setSyzygyPath(self, path):
+        self.options["SyzygyPath"] = path
+
+    def setPosition(self, fen, moves, newGame=False):
+        self.fen = fen
+        self.moves = list(moves)
+        self.newGame = self.newGame or newGame
+
+    def analyse(self, limits=None, onInfo=None):
+        """
+        Searches the position from `setPosition` like `Engine.analyse`.
+        `onInfo(info)` is called from the loop thread for every `info` line.
+        """
+        return self.submit(limits, onInfo).result()
+
+    def submit(self, limits=None, onInfo=None):
+        """
+        Starts `analyse` without waiting, returns a `concurrent.futures.Future`.
+        """
+        return self.loop.submit(self._analyse(limits, onInfo))
+
+    def warmUp(self, movetime=200):
+        return self.loop.run(self.pool.warmUp(movetime))
+
+    async def _analyse(self, limits, onInfo):
+        async with self.pool.acquire(self.options) as engine:
+            if self.newGame:
+                self.newGame = False
+                await engine.newGame()
+            self.search = engine.go(self.fen, self.moves, limits, depth=self.depth)
+            if onInfo is not None:
+                self.search.subscribe(onInfo)
+            return await self.search
+
+    def stop(self):
+        """
+        Stops the running search right away, safe to call from any thread.
+        The interrupted search still returns the best move found so far.
+        """
+        search = self.search
+        if search is not None:
+            self.loop.call(search.stop)
+
+    def kill(self):
+        """
+        Kills the process of the running search, the pool replaces it on its next use.
+        """
+        search = self.search
+        if search is not None and search.engine.process.returncode is None:
+            self.loop.call(search.engine.process.kill)
+
+    def startPonder(self, fen, moves, limits=None):
+        self.loop.run(self._startPonder(fen, list(moves), limits))
+        self.pondering = True
+
+    async def _startPonder(self, fen, moves, limits):
+        # The engine stays out of the pool until ponderhit or stop
+        self.ponderLease = self.pool.acquire(self.options)
+        engine = await self.ponderLease.__aenter__()
+        self.search = engine.go(fen, moves, limits, ponder=True, depth=self.depth)
+
+    def ponderHit(self, onInfo=None):
+        return self.submitPonderHit(onInfo).result()
+
+    def submitPonderHit(self, onInfo=None):
+        self.pondering = False
+        return self.loop.submit(self._finishPonder(hit=True, onInfo=onInfo))
+
+    def stopPonder(self):
+        if not self.pondering:
+            return
+        self.pondering = False
+        self.loop.run(self._finishPonder(hit=False))
+
+    async def _finishPonder(self, hit, onInfo=None):
+        try:
+            if hit:
+                if onInfo is not None:
+                    self.search.subscribe(onInfo)
+                self.search.ponderHit()
+            else:
+                self.search.stop()
+            return await self.search
+        finally:
+            lease, self.ponderLease = self.ponderLease, None
+            await lease.__aexit__(None, None, None)